@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'observability.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,8 +62,22 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'observability.profiling.ProfilingMiddleware',
 ]
 
+# ProfilingMiddleware: Server-Timing header on every response, and a JSON log line
+# ("observability.profiling" logger) for a sample of the requests to these URL names.
+PROFILING_SERVER_TIMING = True
+PROFILING_LOG_ROUTES = {
+    # 'book-list': 0.1,
+    # '*': 0.01,
+}
+
+# MetricsMiddleware / GET /metrics. Under gunicorn, point METRICS_DIR at a directory shared by
+# the workers (emptied on deploy); each worker writes its totals there every METRICS_FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
 ROOT_URLCONF = 'advanced_api_project.urls'
 
 TEMPLATES = [
@@ -96,6 +113,27 @@ DATABASES = {
 }
 
 
+# Cache
+# The response cache generations, the autocomplete change marker and the cache statistics must be
+# seen by every worker process, so the cache is shared: Redis when REDIS_URL is set, otherwise
+# files in a directory all workers on the host can reach. The test runner gets its own directory.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / '.cache' / ('test' if sys.argv[1:2] == ['test'] else 'default')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -18,10 +18,13 @@ from django.contrib import admin
 from django.urls import include, path
 from django.http import HttpResponse 
 
+from observability.metrics import metrics_view
+
 def home(request):
     return HttpResponse("Welcome to the Advanced API Project!")
 urlpatterns = [
     path('', home, name='home'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),  # Include the api app's URLs
+    path('metrics', metrics_view, name='metrics'),  # Prometheus text exposition
 ]
@@ -0,0 +1,219 @@
+# In-process prefix index for type-ahead over book titles and author names.
+import threading
+import time
+import unicodedata
+import uuid
+from array import array
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import connections
+
+from .models import Author, Book
+
+MAX_OFFSET = 255
+CHANGE_KEY = 'api:autocomplete:change'
+# Never equal to a marker read from the cache, so the next check rebuilds.
+STALE = object()
+
+
+def normalize(text):
+    """
+    Case-fold, strip accents and collapse whitespace, so "Émile  Zola" matches "emile z".
+    """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+class AutocompleteIndex:
+    """
+    A sorted array of suffix positions: every label is indexed from its start and from
+    the start of each word, so "potter" finds "Harry Potter". Each position is packed
+    into one integer (`slot << 8 | offset`) and compared through a `bisect` key, which
+    keeps the index at a few bytes per word instead of one string per word. Each kind
+    has its own sorted array, so a `kinds` filter never spends the scan on other kinds.
+
+    Committed writes in this process are applied incrementally by `api.signals`, and each
+    one replaces the shared change marker in the cache. A marker this process did not
+    write (checked at most every `check_interval` seconds) means another process wrote:
+    the index is then rebuilt from the database in a background thread while the old
+    one keeps answering, and swapped in when it is complete. Every `max_age` seconds it
+    is rebuilt regardless, which bounds what a lost marker update can hide.
+    """
+    kinds = {'book': Book, 'author': Author}
+    scan_limit = 300
+    check_interval = 1.0
+    max_age = 600.0
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._marker = STALE
+        self._built_at = None
+        self._checked_at = 0.0
+        # Local changes committed while a rebuild reads the database; replayed on the new index.
+        self._pending = None
+        self._reset()
+
+    def _reset(self):
+        self._codes = {kind: array('Q') for kind in self.kinds}
+        self._normalized = []
+        self._labels = []
+        self._refs = []
+        self._slots = {}
+
+    def _key(self, code):
+        return self._normalized[code >> 8][code & MAX_OFFSET:]
+
+    def _codes_for(self, slot):
+        text = self._normalized[slot]
+        offsets = [0] + [i + 1 for i, char in enumerate(text) if char == ' ']
+        return [slot << 8 | offset for offset in offsets if offset <= MAX_OFFSET]
+
+    def _add(self, kind, pk, label):
+        slot = len(self._labels)
+        self._slots[(kind, pk)] = slot
+        self._labels.append(label)
+        self._normalized.append(normalize(label))
+        self._refs.append((kind, pk))
+        return slot
+
+    def _remove(self, kind, pk):
+        slot = self._slots.pop((kind, pk), None)
+        if slot is None:
+            return
+        codes = self._codes[kind]
+        for code in self._codes_for(slot):
+            i = bisect_left(codes, self._key(code), key=self._key)
+            while codes[i] != code:
+                i += 1
+            del codes[i]
+        # The slot is left empty; rebuilds compact the arrays.
+        self._normalized[slot] = ''
+        self._labels[slot] = None
+
+    def _load(self):
+        fresh = AutocompleteIndex.__new__(AutocompleteIndex)
+        fresh._reset()
+        for kind, model in self.kinds.items():
+            field = 'title' if model is Book else 'name'
+            for pk, label in model.objects.values_list('pk', field).iterator(chunk_size=10000):
+                fresh._add(kind, pk, label)
+        for kind in self.kinds:
+            codes = [code for slot, ref in enumerate(fresh._refs) if ref[0] == kind for code in fresh._codes_for(slot)]
+            codes.sort(key=fresh._key)
+            fresh._codes[kind] = array('Q', codes)
+        return fresh
+
+    def _apply(self, kind, changes):
+        for pk, label in changes:
+            self._remove(kind, pk)
+            if label is not None:
+                for code in self._codes_for(self._add(kind, pk, label)):
+                    insort(self._codes[kind], code, key=self._key)
+
+    def rebuild(self):
+        """
+        Read every label from the database and swap the new index in. Searches keep
+        using the current index (and local writes keep being applied) meanwhile.
+        """
+        with self._rebuild_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            self._pending = []
+            # Everything committed before this marker is in the rows read below.
+            self._marker = cache.get(CHANGE_KEY)
+        try:
+            fresh = self._load()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+                self._marker = STALE
+            raise
+        with self._lock:
+            for kind, changes in self._pending:
+                fresh._apply(kind, changes)
+            self._codes, self._normalized, self._labels = fresh._codes, fresh._normalized, fresh._labels
+            self._refs, self._slots = fresh._refs, fresh._slots
+            self._pending = None
+            self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        try:
+            if self._rebuild_lock.acquire(blocking=False):
+                try:
+                    self._rebuild()
+                finally:
+                    self._rebuild_lock.release()
+        finally:
+            # The thread's own database connection.
+            connections.close_all()
+
+    def start_background_rebuild(self):
+        if not self._rebuild_lock.locked():
+            threading.Thread(target=self._rebuild_in_background, name='autocomplete-rebuild', daemon=True).start()
+
+    def ensure_current(self):
+        if self._built_at is None:
+            # Nothing to serve yet: the first lookups wait for the index.
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self._rebuild()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if cache.get(CHANGE_KEY) != self._marker or now - self._built_at > self.max_age:
+            self.start_background_rebuild()
+
+    def apply(self, kind, changes):
+        """
+        Apply committed local writes, `[(pk, label)]` with label=None for a delete, and
+        publish a new change marker for the other processes.
+        """
+        marker = uuid.uuid4().hex
+        with self._lock:
+            previous = cache.get(CHANGE_KEY)
+            cache.set(CHANGE_KEY, marker, None)
+            # If the marker moved since we last saw it, another process wrote: rebuild soon.
+            self._marker = marker if previous == self._marker else STALE
+            if self._pending is not None:
+                self._pending.append((kind, changes))
+            if self._built_at is not None:
+                self._apply(kind, changes)
+
+    def search(self, query, limit=10, kinds=None):
+        """
+        Return up to `limit` (kind, pk, label) matches: exact matches first, then labels
+        starting with the query, then word matches, shorter labels first.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.ensure_current()
+        with self._lock:
+            best = {}
+            normalized = self._normalized
+            for kind, codes in self._codes.items():
+                if kinds is not None and kind not in kinds:
+                    continue
+                i = bisect_left(codes, prefix, key=self._key)
+                end = min(len(codes), i + self.scan_limit)
+                while i < end:
+                    code = codes[i]
+                    slot, offset = code >> 8, code & MAX_OFFSET
+                    text = normalized[slot]
+                    if not text.startswith(prefix, offset):
+                        break
+                    rank = (text != prefix, offset != 0, len(text), text)
+                    if slot not in best or rank < best[slot]:
+                        best[slot] = rank
+                    i += 1
+            ranked = sorted(best.items(), key=lambda item: item[1])[:limit]
+            return [self._refs[slot] + (self._labels[slot],) for slot, _ in ranked]
+
+index = AutocompleteIndex()
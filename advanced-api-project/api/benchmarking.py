@@ -0,0 +1,102 @@
+# Helpers shared by the benchmark management commands: a throwaway database, seeding and timing.
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .models import Author, Book
+from .stats import rebuild_summaries
+
+WORDS = [
+    'river', 'shadow', 'garden', 'winter', 'empire', 'silent', 'journey', 'stone', 'light',
+    'ocean', 'forest', 'secret', 'crown', 'history', 'night', 'glass', 'fire', 'letters',
+    'machine', 'island', 'storm', 'memory', 'house', 'queen', 'dragon', 'city', 'promise',
+]
+FIRST_NAMES = ['Ada', 'Chinua', 'Doris', 'Gabriel', 'Haruki', 'Iris', 'Jorge', 'Ngugi', 'Toni', 'Wole']
+LAST_NAMES = ['Achebe', 'Borges', 'Lessing', 'Marquez', 'Morrison', 'Murakami', 'Murdoch', 'Soyinka', 'Thiongo', 'Lovelace']
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Run the block against a fresh test database (as the test runner would) so that
+    seeding millions of rows never touches the development database.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def seed_catalog(books, authors=None, batch_size=10000, seed=0):
+    """
+    Top up the Author and Book tables to the requested sizes with bulk inserts.
+    bulk_create sends no signals, so the statistics summaries are rebuilt afterwards.
+    Returns the number of books created.
+    """
+    rng = random.Random(seed)
+    authors = authors or max(1, books // 20)
+
+    missing = authors - Author.objects.count()
+    for start in range(0, max(missing, 0), batch_size):
+        Author.objects.bulk_create(
+            Author(name='%s %s %d' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), start + i))
+            for i in range(min(batch_size, missing - start))
+        )
+    author_ids = list(Author.objects.values_list('id', flat=True))
+
+    missing = books - Book.objects.count()
+    for start in range(0, max(missing, 0), batch_size):
+        Book.objects.bulk_create(
+            Book(
+                title=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).capitalize(),
+                publication_year=rng.randint(1900, 2023),
+                author_id=rng.choice(author_ids),
+            )
+            for _ in range(min(batch_size, missing - start))
+        )
+    if missing > 0:
+        rebuild_summaries()
+    return max(missing, 0)
+
+
+def measure(func, repeat=5):
+    """
+    Call `func` `repeat` times and return the wall-clock durations in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+class SQLTimer:
+    """
+    `connection.execute_wrapper` hook that counts queries and their total time.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
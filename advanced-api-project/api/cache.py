@@ -0,0 +1,123 @@
+# Versioned response cache: entries are keyed by per-model generation counters, so a write
+# invalidates every cached response for that model by bumping a single counter.
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+GENERATION_KEY = 'api:generation:%s'
+
+
+def _incr(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing (never set or evicted): seed it. `add` loses gracefully to a concurrent writer.
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+def _initial_generation():
+    # Never restart from a small number after an eviction: old entries with that
+    # generation could still be in the cache and would be served again.
+    return time.time_ns() // 1000
+
+
+def get_generations(models):
+    keys = [GENERATION_KEY % model._meta.label_lower for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(model):
+    return _incr(GENERATION_KEY % model._meta.label_lower, _initial_generation())
+
+
+def invalidate_model(model):
+    """
+    Bump `model`'s generation now and again once the surrounding transaction commits: another
+    request may read the old rows between the write and the commit and cache them under the
+    first bump. Outside a transaction `on_commit` runs at once.
+    """
+    bump_generation(model)
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+# Per-process counters: a cache hit must not cost a write to the shared cache.
+_stats = {'hit': 0, 'miss': 0}
+_stats_lock = threading.Lock()
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        hits, misses = _stats['hit'], _stats['miss']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+
+def reset_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+class CachedListMixin:
+    """
+    Cache the serialized list response per normalized query string.
+
+    The key contains the current generation of every model in `cache_models`;
+    `api.signals` bumps those on save/delete, so stale entries are never read
+    again and simply expire. Responses carry `X-Cache: HIT|MISS`.
+
+    ETag/Last-Modified set by the view are stored with the data, so a conditional
+    request that hits the cache is answered with 304 without touching the database.
+    """
+    cache_models = ()
+    cache_timeout = 300
+    cached_headers = ('ETag', 'Last-Modified')
+
+    def get_cache_key(self, request):
+        # Pagination links are absolute, so the host and path are part of the key.
+        params = sorted(request.query_params.lists())
+        raw = '%s?%r' % (request.build_absolute_uri(request.path), params)
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        generations = ':'.join(str(generation) for generation in get_generations(self.cache_models))
+        return 'api:response:%s:%s:%s' % (self.__class__.__name__, generations, digest)
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            record('hit')
+            headers = entry['headers']
+            response = get_conditional_response(
+                request, etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            ) or Response(entry['data'])
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('miss')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {header: response[header] for header in self.cached_headers if response.has_header(header)}
+            cache.set(key, {'data': response.data, 'headers': headers}, self.cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,87 @@
+# Conditional requests: cheap ETag/Last-Modified validators so unchanged resources return 304
+# (or 412 for a failed If-Match) before any serializer runs.
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .cache import get_generations
+
+
+def book_validators(book):
+    """
+    Validators for a single book: the ETag carries its version, Last-Modified its row timestamp.
+    """
+    etag = '"%s-%s"' % (book.pk, book.version)
+    return etag, int(book.updated_at.timestamp())
+
+
+def list_validators(request, queryset):
+    """
+    Validators for a filtered list, from one MAX(updated_at)/COUNT aggregate.
+    The count catches deletes, the query string separates pages and orderings.
+    """
+    summary = queryset.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = summary['last_modified']
+    raw = '%s?%r|%s|%s' % (
+        request.build_absolute_uri(request.path), sorted(request.query_params.lists()),
+        last_modified and last_modified.isoformat(), summary['count'],
+    )
+    etag = '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def include_validators(view, etag, last_modified):
+    """
+    Fold the relations embedded with `?include=` into the validators. The related rows carry
+    no version or timestamp, so the ETag also covers their models' cache generations (bumped
+    on every save/delete) and Last-Modified is dropped: it could not see them change.
+    """
+    names = view.get_includes() if hasattr(view, 'get_includes') else []
+    if not names:
+        return etag, last_modified
+    model = view.get_queryset().model
+    related = [model._meta.get_field(name).related_model for name in names]
+    raw = '%s|%s|%s' % (etag, ','.join(names), ':'.join(str(generation) for generation in get_generations(related)))
+    return '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest(), None
+
+
+def check_preconditions(request, etag, last_modified):
+    """
+    Return a 304/412 response if the request's conditional headers say so, else None.
+    """
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    Fetch the book once, answer 304/412 from its version and timestamp, and only serialize on a 200.
+    """
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = include_validators(self, *book_validators(instance))
+        response = check_preconditions(request, etag, last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return set_validators(response, etag, last_modified)
+
+
+class ConditionalListMixin:
+    """
+    Answer 304 for an unchanged list after one aggregate query, before the page is fetched.
+    """
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = include_validators(self, *list_validators(request, self.filter_queryset(self.get_queryset())))
+        response = check_preconditions(request, etag, last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
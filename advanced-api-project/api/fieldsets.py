@@ -0,0 +1,83 @@
+# Sparse fieldsets: `?fields=` / `?exclude=` pick the serialized fields, and only the
+# columns behind those fields are read from the database.
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=id,title` keeps only the listed serializer fields; `?exclude=author` drops
+    the listed ones. Unknown names are rejected with a 400.
+
+    The serializer receives `fields=[...]` (see `SparseFieldsMixin`) and the queryset is
+    restricted with `only()` to the selected fields backed by a column, plus the primary
+    key, the ordering columns (keyset cursors read them from every row) and the view's
+    `sparse_required_fields` (e.g. `updated_at` for ETags), so no deferred field is ever
+    loaded row by row.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+    sparse_required_fields = ()
+
+    def get_sparse_fields(self):
+        """
+        Return the selected serializer field names in declaration order, or None for all.
+        """
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        params = self.request.query_params
+        if self.fields_query_param in params and self.exclude_query_param in params:
+            raise ValidationError({self.fields_query_param: ['Use either fields or exclude, not both.']})
+        for param in (self.fields_query_param, self.exclude_query_param):
+            if param in params:
+                break
+        else:
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        names = {name.strip() for name in params[param].split(',') if name.strip()}
+        unknown = sorted(names - set(available))
+        if unknown:
+            raise ValidationError({param: ['Unknown field(s): %s. Available: %s.' % (', '.join(unknown), ', '.join(available))]})
+        if param == self.fields_query_param:
+            selected = [name for name in available if name in names]
+        else:
+            selected = [name for name in available if name not in names]
+        if not selected:
+            raise ValidationError({param: ['Select at least one field.']})
+        return selected
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        # Runs after the filter backends so the final ordering is known.
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        return self.restrict_columns(queryset, self.get_sparse_columns(queryset, fields))
+
+    def get_sparse_columns(self, queryset, fields):
+        model = queryset.model
+        ordering = [field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+        columns = []
+        for name in [model._meta.pk.name, *ordering, *self.sparse_required_fields, *fields]:
+            name = model._meta.pk.name if name == 'pk' else name
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            # Reverse relations, nested serializers and annotations have no column of their own.
+            if field.concrete and not field.many_to_many and name not in columns:
+                columns.append(name)
+        return columns
+
+    def restrict_columns(self, queryset, columns):
+        return queryset.only(*columns)
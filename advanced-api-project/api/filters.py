@@ -0,0 +1,43 @@
+# BookFilter / AuthorFilter: Exact, range and set filters for the book and author list views.
+from django_filters import rest_framework as filters
+
+from .models import Author, Book
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """
+    Comma-separated integers (`?id__in=1,2,3`), compiled to a plain `IN (...)` without
+    looking the values up first (ModelChoiceFilter would query every author id).
+    """
+
+
+class BookFilter(filters.FilterSet):
+    """
+    - `title`, `author__name`, `publication_year`: exact matches (as before).
+    - `publication_year__gte` / `publication_year__lte`: a year range, compiled to
+      `publication_year >= x AND publication_year <= y` so it is an index range scan on
+      `book_year_id_idx`.
+    - `author__in`, `id__in`: comma-separated ids, served by the author_id and primary key indexes.
+    """
+    publication_year__gte = filters.NumberFilter(field_name='publication_year', lookup_expr='gte')
+    publication_year__lte = filters.NumberFilter(field_name='publication_year', lookup_expr='lte')
+    author__in = NumberInFilter(field_name='author', lookup_expr='in')
+    id__in = NumberInFilter(field_name='id', lookup_expr='in')
+
+    class Meta:
+        model = Book
+        fields = ['title', 'author__name', 'publication_year']
+
+
+class AuthorFilter(filters.FilterSet):
+    """
+    Ranges over the denormalized counters, e.g. `?book_count__gte=10`; no join with Book.
+    """
+    book_count__gte = filters.NumberFilter(field_name='book_count', lookup_expr='gte')
+    book_count__lte = filters.NumberFilter(field_name='book_count', lookup_expr='lte')
+    latest_publication_year__gte = filters.NumberFilter(field_name='latest_publication_year', lookup_expr='gte')
+    latest_publication_year__lte = filters.NumberFilter(field_name='latest_publication_year', lookup_expr='lte')
+
+    class Meta:
+        model = Author
+        fields = ['name']
@@ -0,0 +1,56 @@
+# `?include=`: embed related objects, loaded for the whole page with one query per relation.
+from rest_framework.exceptions import ValidationError
+
+
+class IncludeMixin:
+    """
+    `?include=author` replaces each row's related primary key with the serialized object.
+
+    Instead of touching the relation row by row (one query per row), the primary keys
+    of the whole page are collected first and every relation is loaded with a single
+    `in_bulk()`, DataLoader style; the serializer then looks the objects up in its
+    `included` context.
+
+    `include_relations` maps a forward relation name to the serializer used to embed it.
+    A value of None marks a relation the view always embeds (accepted, nothing to load).
+    """
+    include_query_param = 'include'
+    include_relations = {}
+
+    def get_includes(self):
+        raw = self.request.query_params.get(self.include_query_param)
+        if not raw:
+            return []
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(self.include_relations))
+        if unknown:
+            raise ValidationError({self.include_query_param: ['Unknown relation(s): %s. Available: %s.' % (
+                ', '.join(unknown), ', '.join(self.include_relations))]})
+        fields = getattr(self, 'get_sparse_fields', lambda: None)()
+        return [
+            name for name in dict.fromkeys(names)
+            if self.include_relations[name] is not None and (fields is None or name in fields)
+        ]
+
+    def get_serializer(self, *args, **kwargs):
+        names = self.get_includes()
+        if names and args:
+            rows = args[0] if kwargs.get('many') else [args[0]]
+            context = kwargs.get('context') or self.get_serializer_context()
+            kwargs['context'] = dict(context, included=self.load_included(rows, names))
+        return super().get_serializer(*args, **kwargs)
+
+    def load_included(self, rows, names):
+        model = self.get_queryset().model
+        included = {}
+        for name in names:
+            field = model._meta.get_field(name)
+            ids = {
+                row[name] if isinstance(row, dict) else getattr(row, field.attname)
+                for row in rows
+            }
+            ids.discard(None)
+            serializer_class = self.include_relations[name]
+            objects = field.related_model.objects.in_bulk(ids)
+            included[name] = {pk: serializer_class(obj, context={'request': self.request}).data for pk, obj in objects.items()}
+        return included
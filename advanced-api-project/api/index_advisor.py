@@ -0,0 +1,202 @@
+# Index advisor: turn the filter (filterset_class / filterset_fields), search and ordering declarations
+# of the DRF views into representative queries, EXPLAIN them, and suggest the indexes that would avoid
+# full scans.
+import datetime
+import re
+from collections import namedtuple
+
+from django.db import connection, migrations, models
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.urls import URLPattern, URLResolver, get_resolver
+
+# SearchFilter prefixes and the lookups they compile to.
+SEARCH_LOOKUPS = {'^': 'istartswith', '=': 'iexact', '@': 'search', '$': 'iregex'}
+# Lookups a B-tree index cannot serve (case-insensitive or infix matches).
+UNINDEXABLE_LOOKUPS = {'icontains', 'contains', 'istartswith', 'iendswith', 'endswith', 'iexact', 'iregex', 'regex', 'search'}
+
+Finding = namedtuple('Finding', 'model kind path lookup plan full_scan sort target suggestion views')
+
+
+def declared_views(urlconf=None):
+    """
+    Return the view classes routed in `urlconf` that declare filter, search or ordering fields.
+    """
+    views = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                view = getattr(pattern.callback, 'view_class', None)
+                if view is not None and view not in views and any(
+                    getattr(view, name, None)
+                    for name in ('filterset_class', 'filterset_fields', 'search_fields', 'ordering_fields')
+                ):
+                    views.append(view)
+
+    walk(get_resolver(urlconf).url_patterns)
+    return views
+
+
+def view_model(view):
+    queryset = getattr(view, 'queryset', None)
+    if queryset is not None:
+        return queryset.model
+    return view.serializer_class.Meta.model
+
+
+def view_queries(view):
+    """
+    Yield (kind, path, lookup) for every declared filter, search and ordering field.
+    """
+    filterset_class = getattr(view, 'filterset_class', None)
+    if filterset_class is not None:
+        for declared in filterset_class.base_filters.values():
+            # Filters with a custom `method` build their own query; nothing to infer.
+            if not declared.method:
+                yield 'filter', declared.field_name, declared.lookup_expr
+    filterset_fields = getattr(view, 'filterset_fields', None) or []
+    if isinstance(filterset_fields, dict):
+        for path, lookups in filterset_fields.items():
+            for lookup in lookups:
+                yield 'filter', path, lookup
+    else:
+        for path in filterset_fields:
+            yield 'filter', path, 'exact'
+    for path in getattr(view, 'search_fields', None) or []:
+        lookup = SEARCH_LOOKUPS.get(path[0], 'icontains')
+        yield 'search', path.lstrip(''.join(SEARCH_LOOKUPS)), lookup
+    ordering_fields = getattr(view, 'ordering_fields', None) or []
+    if ordering_fields != '__all__':
+        for path in ordering_fields:
+            yield 'ordering', path, None
+
+
+def resolve_field(model, path):
+    """
+    Follow a lookup path such as `author__name` and return the final (model, field).
+    """
+    parts = path.split('__')
+    for i, part in enumerate(parts):
+        field = model._meta.get_field(part)
+        if field.is_relation and i < len(parts) - 1:
+            model = field.related_model
+    return model, field
+
+
+def sample_value(field, lookup):
+    if isinstance(field, (models.IntegerField, models.AutoField, models.ForeignKey, models.FloatField, models.DecimalField)):
+        value = 1
+    elif isinstance(field, models.DateTimeField):
+        value = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    elif isinstance(field, models.DateField):
+        value = datetime.date(2000, 1, 1)
+    elif isinstance(field, models.BooleanField):
+        value = True
+    else:
+        value = 'x'
+    if lookup in ('in', 'range'):
+        return [value, value]
+    return value
+
+
+def representative_queryset(model, kind, path, lookup, page_size=20):
+    """
+    The query a request using this declaration runs: a filtered page, or an ordered keyset page.
+    """
+    if kind == 'ordering':
+        return model.objects.order_by(path, model._meta.pk.name)[:page_size]
+    _, field = resolve_field(model, path)
+    return model.objects.filter(**{'%s__%s' % (path, lookup): sample_value(field, lookup)})[:page_size]
+
+
+def plan_problems(plan, table):
+    """
+    Return (full_scan, sort) for an EXPLAIN output on SQLite or PostgreSQL.
+    """
+    if connection.vendor == 'postgresql':
+        full_scan = re.search(r'Seq Scan on "?%s"?\b' % re.escape(table), plan) is not None
+        sort = re.search(r'^\s*(->\s*)?Sort\b', plan, re.MULTILINE) is not None
+    else:
+        full_scan = re.search(r'\bSCAN (TABLE )?%s$' % re.escape(table), plan, re.MULTILINE) is not None
+        sort = 'USE TEMP B-TREE FOR ORDER BY' in plan
+    return full_scan, sort
+
+
+def leading_index_columns(model):
+    """
+    Columns that lead an existing index (or key) of the model's table, read from the database.
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        info['columns'][0] for info in constraints.values()
+        if info['columns'] and (info['index'] or info['unique'] or info['primary_key'])
+    }
+
+
+def index_name(model, field):
+    # Same scheme as the hand-written indexes, e.g. book_title_id_idx, within the 30 character limit.
+    name = '%s_%s_id_idx' % (model._meta.model_name, field.name)
+    if len(name) > 30:
+        name = ('%s_%s' % (model._meta.model_name, field.name))[:26] + '_idx'
+    return name
+
+
+def advise(views):
+    """
+    EXPLAIN the representative query of every declaration and return a list of Findings.
+    Declarations shared by several views are explained once.
+    """
+    findings = {}
+    for view in views:
+        model = view_model(view)
+        for kind, path, lookup in view_queries(view):
+            key = (model, kind, path, lookup)
+            if key in findings:
+                findings[key].views.append(view.__name__)
+                continue
+            target_model, field = resolve_field(model, path)
+            plan = representative_queryset(model, kind, path, lookup).explain()
+            full_scan, sort = plan_problems(plan, target_model._meta.db_table)
+            # Filters and searches are unordered here; only an ordering declaration can cause a sort.
+            sort = sort and kind == 'ordering'
+            suggestion = None
+            indexable = kind == 'ordering' or lookup not in UNINDEXABLE_LOOKUPS
+            if (full_scan or sort) and indexable and field.concrete and field.column not in leading_index_columns(target_model):
+                suggestion = models.Index(
+                    fields=[field.name, target_model._meta.pk.name], name=index_name(target_model, field),
+                )
+            findings[key] = Finding(
+                model, kind, path, lookup, plan, full_scan, sort, target_model, suggestion, [view.__name__],
+            )
+    return list(findings.values())
+
+
+def suggested_migrations(findings):
+    """
+    Build one migration per app adding the suggested indexes; returns MigrationWriters.
+    """
+    operations = {}
+    for finding in findings:
+        if finding.suggestion is None:
+            continue
+        app_operations = operations.setdefault(finding.target._meta.app_label, {})
+        # Several declarations can ask for the same index.
+        app_operations.setdefault(finding.suggestion.name, migrations.AddIndex(
+            model_name=finding.target._meta.model_name, index=finding.suggestion,
+        ))
+
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    writers = []
+    for app_label, app_operations in sorted(operations.items()):
+        leaves = loader.graph.leaf_nodes(app_label)
+        number = max([MigrationAutodetector.parse_number(name) or 0 for _, name in leaves] or [0]) + 1
+        migration = migrations.Migration('%04d_suggested_indexes' % number, app_label)
+        migration.dependencies = leaves
+        migration.operations = list(app_operations.values())
+        writers.append(MigrationWriter(migration))
+    return writers
@@ -0,0 +1,25 @@
+# The server side of benchmark_asgi, run by uvicorn in its own process. Kept out of the command
+# module: uvicorn imports it before Django is set up, so it must not import models at the top.
+import os
+
+DATABASE_ENV = 'BENCHMARK_ASGI_DATABASE'
+
+
+def serve():
+    """
+    uvicorn application factory: the project's ASGI application on the seeded benchmark
+    database, without the response cache (it would turn the sync list into a cache benchmark).
+    """
+    from django.conf import settings
+    from django.core.asgi import get_asgi_application
+    from django.test.utils import setup_test_environment
+
+    # Before any thread opens a connection: each one reads its settings from DATABASES.
+    settings.DATABASES['default']['NAME'] = os.environ[DATABASE_ENV]
+    application = get_asgi_application()
+    from api.cache import CachedListMixin  # needs the app registry
+
+    # The load generator sends "Host: testserver", as the test client would.
+    setup_test_environment(debug=False)
+    CachedListMixin.cache_timeout = 0
+    return application
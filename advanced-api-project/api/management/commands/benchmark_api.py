@@ -0,0 +1,172 @@
+import json
+import platform
+import time
+from unittest.mock import patch
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.benchmarking import SQLTimer, benchmark_database, percentile, seed_catalog
+from api.cache import CachedListMixin
+from api.models import Book
+
+
+def route_requests(book, author):
+    """
+    One representative request per named route in api/urls.py: (method, kwargs, query, body, writes).
+    Routes missing here are driven with a GET (and `pk` set to a book id if the route needs one).
+    """
+    new_book = {'title': 'Benchmark Book', 'publication_year': 2000, 'author': author.pk}
+    return {
+        'book-list': ('get', {}, {'ordering': '-publication_year'}, None, False),
+        'book-detail': ('get', {'pk': book.pk}, {}, None, False),
+        'book-export': ('get', {}, {'publication_year': book.publication_year, 'author__name': author.name}, None, False),
+        'book-create': ('post', {}, {}, new_book, True),
+        'book-update': ('put', {}, {}, dict(new_book, id=book.pk), True),
+        'book-update-detail': ('patch', {'pk': book.pk}, {}, {'title': 'Benchmark Book'}, True),
+        'book-delete': ('delete', {}, {}, {'id': book.pk}, True),
+        'book-bulk-create': ('post', {}, {}, [new_book] * 100, True),
+        'book-bulk-update': ('put', {}, {}, [dict(new_book, id=book.pk)], True),
+        'book-bulk-delete': ('delete', {}, {}, [book.pk], True),
+        'author-list': ('get', {}, {'ordering': 'name'}, None, False),
+        'author-detail': ('get', {'pk': author.pk}, {}, None, False),
+        'autocomplete': ('get', {}, {'q': book.title[:3]}, None, False),
+        'batch': ('post', {}, {}, [
+            {'method': 'GET', 'path': reverse('book-detail', kwargs={'pk': book.pk})},
+            {'method': 'GET', 'path': reverse('author-detail', kwargs={'pk': author.pk})},
+            {'method': 'POST', 'path': reverse('book-create'), 'body': new_book},
+        ], True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed Authors/Books at several sizes, drive every api/urls.py route through the test client '
+        'and write p50/p95 latency, query count and SQL time per endpoint to a JSON report. '
+        'With --compare, diff two reports and fail on regressions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Book counts to seed, ascending.')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', default='benchmark-report.json')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the list response cache enabled.')
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'), help='Diff two reports instead of running.')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p95 / SQL time increase in percent.')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore timing changes smaller than this (noise floor).')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'], threshold=options['threshold'], min_delta=options['min_delta_ms'])
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'results': {},
+        }
+        cache_timeout = CachedListMixin.cache_timeout if options['warm_cache'] else 0
+        with benchmark_database(keepdb=options['keepdb']), patch.object(CachedListMixin, 'cache_timeout', cache_timeout):
+            client = APIClient()
+            client.force_authenticate(User.objects.create_superuser(username='benchmark', password='benchmark'))
+            for size in sorted(options['sizes']):
+                self.stdout.write('Seeding %d books...' % size)
+                seed_catalog(size)
+                report['results'][str(size)] = self.run_routes(client, options['iterations'])
+
+        with open(options['output'], 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        self.stdout.write(self.style.SUCCESS('Report written to %s' % options['output']))
+
+    def run_routes(self, client, iterations):
+        book = Book.objects.select_related('author').order_by('id').first()
+        specs = route_requests(book, book.author)
+        results = {}
+        for pattern in api_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            default_kwargs = {name: book.pk for name in pattern.pattern.converters}
+            method, kwargs, query, body, writes = specs.get(pattern.name, ('get', default_kwargs, {}, None, False))
+            path = reverse(pattern.name, kwargs=kwargs)
+
+            def call():
+                return getattr(client, method)(path, query if method == 'get' else body, format=None if method == 'get' else 'json')
+
+            self.drive(call, writes)  # Warm-up: lazy indexes, caches, imports.
+            latencies, timers, status_code = [], [], None
+            for _ in range(iterations):
+                timer = SQLTimer()
+                with connection.execute_wrapper(timer):
+                    start = time.perf_counter()
+                    response = self.drive(call, writes)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                timers.append(timer)
+                status_code = response.status_code
+
+            results[pattern.name] = {
+                'method': method.upper(),
+                'path': path,
+                'status': status_code,
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'queries': max(timer.queries for timer in timers),
+                'sql_ms': round(percentile([timer.seconds * 1000 for timer in timers], 50), 3),
+            }
+            self.stdout.write('  %-20s %-6s %4d  p50 %8.2f ms  p95 %8.2f ms  %3d queries  %8.2f ms SQL' % (
+                pattern.name, method.upper(), status_code, results[pattern.name]['p50_ms'],
+                results[pattern.name]['p95_ms'], results[pattern.name]['queries'], results[pattern.name]['sql_ms']))
+        return results
+
+    def drive(self, call, writes):
+        if not writes:
+            return self.consume(call())
+        # Writes are rolled back so every iteration sees the same table size.
+        with transaction.atomic():
+            response = self.consume(call())
+            transaction.set_rollback(True)
+        return response
+
+    def consume(self, response):
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def compare(self, baseline_path, candidate_path, threshold, min_delta):
+        with open(baseline_path) as baseline_file, open(candidate_path) as candidate_file:
+            baseline, candidate = json.load(baseline_file), json.load(candidate_file)
+
+        regressions = []
+        self.stdout.write('%-9s %-20s %18s %18s %14s' % ('size', 'route', 'p95 ms', 'SQL ms', 'queries'))
+        for size, routes in candidate['results'].items():
+            for name, new in routes.items():
+                old = baseline['results'].get(size, {}).get(name)
+                if old is None:
+                    continue
+                p95_change = self.change(old['p95_ms'], new['p95_ms'])
+                sql_change = self.change(old['sql_ms'], new['sql_ms'])
+                self.stdout.write('%-9s %-20s %8.2f (%+6.1f%%) %8.2f (%+6.1f%%) %6d -> %-4d' % (
+                    size, name, new['p95_ms'], p95_change, new['sql_ms'], sql_change, old['queries'], new['queries']))
+                slower = any(
+                    change > threshold and new[key] - old[key] >= min_delta
+                    for key, change in [('p95_ms', p95_change), ('sql_ms', sql_change)]
+                )
+                if slower or new['queries'] > old['queries']:
+                    regressions.append('%s @ %s' % (name, size))
+
+        if regressions:
+            raise CommandError('Regressions beyond %.0f%%: %s' % (threshold, ', '.join(regressions)))
+        self.stdout.write(self.style.SUCCESS('No regressions beyond %.0f%%.' % threshold))
+
+    def change(self, old, new):
+        if not old:
+            return 0.0
+        return (new - old) / old * 100
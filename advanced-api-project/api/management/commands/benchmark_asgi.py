@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from api.benchmarking import benchmark_database, percentile, seed_catalog
+from api.models import Book
+
+from ._asgi_server import DATABASE_ENV
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the project with uvicorn in a subprocess and compare the sync and native async '
+        'book views under many concurrent keep-alive connections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per route.')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        if find_spec('uvicorn') is None:
+            raise CommandError('benchmark_asgi needs uvicorn: pip install uvicorn')
+
+        # The server runs in its own process (so the load generator does not share its GIL),
+        # which cannot see the in-memory test database: seed a file instead.
+        database = settings.BASE_DIR / '.cache' / 'benchmark_asgi.sqlite3'
+        database.parent.mkdir(parents=True, exist_ok=True)
+        with patch.dict(connection.settings_dict['TEST'], NAME=str(database)), benchmark_database(keepdb=options['keepdb']):
+            seed_catalog(options['rows'])
+            pk = Book.objects.order_by('id').values_list('id', flat=True)[options['rows'] // 2]
+            routes = [
+                ('list (sync)', reverse('book-list') + '?ordering=-publication_year'),
+                ('list (async)', reverse('book-list-async') + '?ordering=-publication_year'),
+                ('detail (sync)', reverse('book-detail', kwargs={'pk': pk})),
+                ('detail (async)', reverse('book-detail-async', kwargs={'pk': pk})),
+            ]
+
+            server = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'uvicorn', 'api.management.commands._asgi_server:serve', '--factory', '--workers', '1',
+                    '--host', options['host'], '--port', str(options['port']), '--lifespan', 'off',
+                    '--log-level', 'warning', '--backlog', str(max(2048, options['connections'])),
+                ],
+                cwd=settings.BASE_DIR, env=dict(os.environ, **{DATABASE_ENV: str(database)}),
+            )
+            try:
+                wait_for_server(server, options['host'], options['port'])
+                self.stdout.write('%-16s %10s %9s %9s %9s %8s' % ('route', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+                for name, path in routes:
+                    latencies, errors, elapsed = asyncio.run(load(
+                        options['host'], options['port'], path, options['connections'], options['duration'],
+                    ))
+                    if not latencies:
+                        self.stdout.write('%-16s %10s %9s %9s %9s %8d' % (name, '-', '-', '-', '-', errors))
+                        continue
+                    self.stdout.write('%-16s %10.0f %9.1f %9.1f %9.1f %8d' % (
+                        name, len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 95),
+                        percentile(latencies, 99), errors,
+                    ))
+            finally:
+                server.terminate()
+                server.wait()
+
+
+def wait_for_server(server, host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        if server.poll() is not None:
+            raise CommandError('uvicorn failed to start on %s:%d' % (host, port))
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise CommandError('uvicorn did not start on %s:%d within %.0fs' % (host, port, timeout))
+            time.sleep(0.1)
+
+
+async def load(host, port, path, connections, duration):
+    """
+    Open `connections` keep-alive connections and send GET `path` on each, back to back,
+    for `duration` seconds. Returns (latencies in ms, error count, elapsed seconds).
+    """
+    latencies = []
+    errors = [0]
+    # The test environment only allows the "testserver" host.
+    request = ('GET %s HTTP/1.1\r\nHost: testserver\r\nConnection: keep-alive\r\n\r\n' % path).encode('ascii')
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def connection():
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            errors[0] += 1
+            return
+        try:
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status = await read_response(reader)
+                latencies.append((time.perf_counter() - sent) * 1000)
+                if status != 200:
+                    errors[0] += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors[0] += 1
+        finally:
+            writer.close()
+
+    await asyncio.gather(*[connection() for _ in range(connections)])
+    return latencies, errors[0], time.perf_counter() - start
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response (Content-Length or chunked body) and return its status code.
+    """
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    status_line, *header_lines = head.rstrip('\r\n').split('\r\n')
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split()[1])
@@ -0,0 +1,42 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.autocomplete import AutocompleteIndex
+from api.benchmarking import benchmark_database, percentile, seed_catalog
+from api.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Measure autocomplete index build time and lookup latency on a seeded Book table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--lookups', type=int, default=10000)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            seed_catalog(options['rows'])
+            index = AutocompleteIndex()
+            start = time.perf_counter()
+            index.rebuild()
+            self.stdout.write('Indexed %d entries (%d positions) in %.1f s' % (
+                len(index._labels), sum(len(codes) for codes in index._codes.values()), time.perf_counter() - start))
+
+            rng = random.Random(0)
+            titles = list(Book.objects.values_list('title', flat=True)[:10000])
+            queries = []
+            for _ in range(options['lookups']):
+                words = rng.choice(titles).split()
+                word = ' '.join(words[rng.randrange(len(words)):])
+                queries.append(word[:rng.randint(1, 8)])
+
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query)
+                samples.append((time.perf_counter() - start) * 1000000)
+            self.stdout.write('Lookup latency over %d queries: p50 %.0f us, p95 %.0f us, p99 %.0f us' % (
+                len(samples), percentile(samples, 50), percentile(samples, 95), percentile(samples, 99)))
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.benchmarking import benchmark_database, seed_catalog
+from api.models import Author, Book
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of the single-item and bulk Book write endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=2000, help='Number of books written per scenario.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        count = options['items']
+        with benchmark_database(keepdb=options['keepdb']):
+            seed_catalog(books=0, authors=100)
+            author_ids = list(Author.objects.values_list('id', flat=True))
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(username='benchmark'))
+            items = [
+                {'title': 'Benchmark %d' % i, 'publication_year': 1900 + i % 120, 'author': author_ids[i % len(author_ids)]}
+                for i in range(count)
+            ]
+            bulk_params = '?batch_size=%d' % options['batch_size']
+
+            self.stdout.write('%-10s %14s %14s %10s' % ('operation', 'single rows/s', 'bulk rows/s', 'speedup'))
+
+            single = self.rate(count, lambda: [
+                client.post(reverse('book-create'), item, format='json') for item in items])
+            bulk = self.rate(count, lambda: client.post(reverse('book-bulk-create') + bulk_params, items, format='json'))
+            self.report('create', single, bulk)
+
+            books = list(Book.objects.values('id', 'title', 'publication_year', 'author'))
+            for book in books:
+                book['title'] += ' (revised)'
+            half = len(books) // 2
+            single = self.rate(half, lambda: [
+                client.put(reverse('book-update'), book, format='json') for book in books[:half]])
+            bulk = self.rate(half, lambda: client.put(reverse('book-bulk-update') + bulk_params, books[half:half * 2], format='json'))
+            self.report('update', single, bulk)
+
+            single = self.rate(half, lambda: [
+                client.delete(reverse('book-delete'), {'id': book['id']}, format='json') for book in books[:half]])
+            bulk = self.rate(half, lambda: client.delete(
+                reverse('book-bulk-delete') + bulk_params, [book['id'] for book in books[half:half * 2]], format='json'))
+            self.report('delete', single, bulk)
+
+    def rate(self, rows, func):
+        start = time.perf_counter()
+        func()
+        return rows / (time.perf_counter() - start)
+
+    def report(self, operation, single, bulk):
+        self.stdout.write('%-10s %14.0f %14.0f %9.1fx' % (operation, single, bulk, bulk / single))
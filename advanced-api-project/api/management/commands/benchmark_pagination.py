@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import benchmark_database, measure, seed_catalog
+from api.models import Book
+from api.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    help = 'Compare keyset pagination with LimitOffset pagination on a seeded Book table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Number of books to seed.')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--pages', default='1,10,100,1000,10000', help='Comma-separated page numbers to fetch.')
+        parser.add_argument('--ordering', default='id,title,-publication_year', help='Comma-separated orderings to test.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keepdb', action='store_true', help='Keep the seeded test database between runs.')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        pages = [int(page) for page in options['pages'].split(',')]
+        factory = APIRequestFactory()
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write('Seeding %d books...' % options['rows'])
+            seed_catalog(options['rows'])
+            self.stdout.write('%-20s %8s %16s %16s' % ('ordering', 'page', 'limitoffset ms', 'keyset ms'))
+
+            for ordering in options['ordering'].split(','):
+                keyset = KeysetPagination()
+                queryset = Book.objects.order_by(ordering)
+                keyset.ordering = keyset.get_ordering(queryset)
+                queryset = queryset.order_by(*keyset.ordering)
+
+                for page in pages:
+                    offset = (page - 1) * page_size
+                    if offset >= options['rows']:
+                        continue
+                    offset_request = Request(factory.get('/api/books/', {'limit': page_size, 'offset': offset}))
+                    keyset_request = Request(factory.get('/api/books/', self.cursor_params(keyset, queryset, offset)))
+
+                    offset_ms = measure(lambda: list(LimitOffsetPagination().paginate_queryset(
+                        queryset, offset_request)), options['repeat'])
+                    keyset_ms = measure(lambda: list(KeysetPagination().paginate_queryset(
+                        queryset, keyset_request)), options['repeat'])
+                    self.stdout.write('%-20s %8d %16.2f %16.2f' % (
+                        ordering, page, min(offset_ms), min(keyset_ms)))
+
+    def cursor_params(self, keyset, queryset, offset):
+        params = {'page_size': keyset.page_size}
+        if offset:
+            # Position of the last row on the previous page; looked up once, outside the timing.
+            last_row = queryset[offset - 1]
+            params['cursor'] = keyset.make_token('n', keyset.get_position(last_row))
+        return params
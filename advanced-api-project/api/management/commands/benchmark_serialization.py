@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarking import benchmark_database, seed_catalog
+from api.models import Book
+from api.serializers import BookSerializer, BookValuesSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare BookSerializer with the BookValuesSerializer fast path, in rows per second.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--page-size', type=int, default=1000, help='Rows serialized per call.')
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        with benchmark_database(keepdb=options['keepdb']):
+            seed_catalog(options['rows'])
+            queryset = Book.objects.order_by('id')
+            page_size = options['page_size']
+            pages = [(start, start + page_size) for start in range(0, options['rows'], page_size)]
+
+            def model_path():
+                for start, end in pages:
+                    yield BookSerializer(queryset[start:end], many=True).data
+
+            def values_path():
+                for start, end in pages:
+                    yield BookValuesSerializer(list(BookValuesSerializer.values(queryset)[start:end])).data
+
+            self.stdout.write('%-22s %14s %14s' % ('path', 'rows/s', 'rows/s + JSON'))
+            for name, path in [('BookSerializer', model_path), ('BookValuesSerializer', values_path)]:
+                self.stdout.write('%-22s %14.0f %14.0f' % (name, self.rate(path, False), self.rate(path, True)))
+
+    def rate(self, path, render):
+        renderer = JSONRenderer()
+        rows = 0
+        start = time.perf_counter()
+        for data in path():
+            if render:
+                renderer.render(data)
+            rows += len(data)
+        return rows / (time.perf_counter() - start)
@@ -0,0 +1,58 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import benchmark_database
+from api.index_advisor import advise, declared_views, suggested_migrations
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the queries behind every filter, search and ordering field declared by the routed '
+        'views, report full table scans and sorts, and suggest a migration with the missing indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fresh-db', action='store_true', help='Explain against a throwaway database migrated from scratch.')
+        parser.add_argument('--write', action='store_true', help='Write the suggested migrations into their apps.')
+
+    def handle(self, *args, **options):
+        if options['fresh_db']:
+            with benchmark_database():
+                findings = advise(declared_views())
+                writers = suggested_migrations(findings)
+        else:
+            findings = advise(declared_views())
+            writers = suggested_migrations(findings)
+
+        for finding in findings:
+            problems = [name for name, found in [('full scan', finding.full_scan), ('sort', finding.sort)] if found]
+            if finding.suggestion is not None:
+                verdict = 'missing index -> %s%s' % (finding.suggestion.name, tuple(finding.suggestion.fields))
+            elif problems and finding.kind == 'search':
+                verdict = 'not indexable (%s)' % finding.lookup
+            elif problems:
+                verdict = 'no B-tree index helps'
+            else:
+                verdict = 'ok'
+            declaration = finding.path if finding.lookup is None else '%s__%s' % (finding.path, finding.lookup)
+            self.stdout.write('%-8s %-8s %-32s %-22s %s' % (
+                finding.model.__name__, finding.kind, declaration, ', '.join(problems) or '-', verdict,
+            ))
+            if options['verbosity'] > 1:
+                for line in finding.plan.splitlines():
+                    self.stdout.write('    %s' % line)
+                self.stdout.write('    views: %s' % ', '.join(finding.views))
+
+        if not writers:
+            self.stdout.write(self.style.SUCCESS('No missing indexes.'))
+            return
+        for writer in writers:
+            if options['write']:
+                os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+                with open(writer.path, 'w') as migration_file:
+                    migration_file.write(writer.as_string())
+                self.stdout.write(self.style.SUCCESS('Wrote %s' % writer.path))
+            else:
+                self.stdout.write('\n# %s\n%s' % (writer.path, writer.as_string()))
+        self.stdout.write('Add the same indexes to the models\' Meta.indexes so makemigrations stays in sync.')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.stats import rebuild_summaries, verify_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-year and per-author book statistics from a full aggregate, then verify them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify-only', action='store_true', help='Report drift without rewriting the summaries.')
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            rebuild_summaries()
+            self.stdout.write('Rebuilt book statistics.')
+        mismatches = verify_summaries()
+        for mismatch in mismatches:
+            self.stderr.write(mismatch)
+        if mismatches:
+            raise CommandError('%d statistics rows do not match the Book table.' % len(mismatches))
+        self.stdout.write('Book statistics match the Book table.')
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Book = apps.get_model('api', 'Book')
+    PublicationYearStat = apps.get_model('api', 'PublicationYearStat')
+    AuthorBookStat = apps.get_model('api', 'AuthorBookStat')
+    PublicationYearStat.objects.bulk_create(
+        PublicationYearStat(publication_year=row['publication_year'], book_count=row['count'])
+        for row in Book.objects.values('publication_year').annotate(count=Count('id')).order_by()
+    )
+    AuthorBookStat.objects.bulk_create(
+        AuthorBookStat(author_id=row['author'], book_count=row['count'])
+        for row in Book.objects.values('author').annotate(count=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationYearStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publication_year', models.IntegerField(unique=True)),
+                ('book_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuthorBookStat',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='book_stat', serialize=False, to='api.author')),
+                ('book_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['book_count'], name='authorbookstat_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def populate_counters(apps, schema_editor):
+    Author = apps.get_model('api', 'Author')
+    Book = apps.get_model('api', 'Book')
+    totals = Book.objects.values('author').annotate(count=Count('id'), latest=Max('publication_year')).order_by()
+    for row in totals.iterator():
+        Author.objects.filter(pk=row['author']).update(book_count=row['count'], latest_publication_year=row['latest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_book_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='latest_publication_year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['book_count', 'id'], name='author_count_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['latest_publication_year', 'id'], name='author_latest_id_idx'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+        # Per-author counts now live on Author itself.
+        migrations.DeleteModel(
+            name='AuthorBookStat',
+        ),
+    ]
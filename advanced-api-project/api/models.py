@@ -2,6 +2,16 @@ from django.db import models
 # Author model: Represents an author with a name.
 class Author(models.Model):
     name = models.CharField(max_length=100)
+    # Denormalized from Book by api.stats (F() updates on every book write); see rebuild_book_stats.
+    book_count = models.IntegerField(default=0)
+    latest_publication_year = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='author_name_id_idx'),
+            models.Index(fields=['book_count', 'id'], name='author_count_id_idx'),
+            models.Index(fields=['latest_publication_year', 'id'], name='author_latest_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -11,6 +21,40 @@ class Book(models.Model):
     title = models.CharField(max_length=200)
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
+    # Drives ETag/Last-Modified validators; indexed so MAX(updated_at) is an index lookup.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Incremented on every update; the detail ETag and BookUpdateView's optimistic concurrency use it.
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        # Composite indexes for keyset pagination: one per ordering field, with id as tie-breaker.
+        indexes = [
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            models.Index(fields=['publication_year', 'id'], name='book_year_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so signal receivers can tell what a save changed.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        self._loaded_values = {'author_id': self.author_id, 'publication_year': self.publication_year}
+
+    def __str__(self):
+        return self.title
+
+# PublicationYearStat: Number of books per publication year, kept up to date by signals.
+class PublicationYearStat(models.Model):
+    publication_year = models.IntegerField(unique=True)
+    book_count = models.IntegerField(default=0)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return '%s: %s' % (self.publication_year, self.book_count)
@@ -0,0 +1,227 @@
+# KeysetPagination: Cursor pagination that seeks on the ordering columns instead of using OFFSET.
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination for any ordering chosen through OrderingFilter.
+
+    The queryset ordering is read after filtering, and the primary key is
+    appended as a tie-breaker so every row has a unique position. The cursor
+    stores the values of the last row on the page, and the next page is fetched
+    with a row-value comparison such as
+    `(publication_year > 1999) OR (publication_year = 1999 AND id > 42)`.
+    With a matching composite index (see `Book.Meta.indexes`) every page is a
+    single index range scan: there is no OFFSET and no COUNT(*).
+
+    NULLs in a nullable column sort after every value (NULLS LAST ascending,
+    NULLS FIRST descending) on every database, and the seek predicate agrees.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    default_ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async variant for the ASGI views: same seek query, fetched with `aiterator()`.
+        """
+        queryset = self.get_page_queryset(queryset, request)
+        return self.get_page([row async for row in queryset.aiterator()])
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the (unevaluated) query for the requested page.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.cursor = self.decode_cursor(request)
+
+        self.reverse = self.cursor is not None and self.cursor['d'] == 'p'
+        queryset = queryset.order_by(*[self.order_expression(field, self.reverse) for field in self.ordering])
+        if self.cursor is not None:
+            queryset = queryset.filter(self.seek_filter(self.cursor['v'], self.reverse))
+
+        # Fetch one extra row to find out whether there is another page.
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.first_position = self.get_position(rows[0]) if rows else None
+        self.last_position = self.get_position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering applied by OrderingFilter (or the default), with the
+        primary key appended so that positions are unique.
+        """
+        ordering = list(queryset.query.order_by) or list(self.default_ordering)
+        if not all(isinstance(field, str) for field in ordering):
+            raise NotFound('Cannot paginate on an ordering expression')
+        ordering = ['id' if field.lstrip('-') == 'pk' else field for field in ordering]
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            # Follow the direction of the leading column so one index scan serves the page.
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        self.nullable = {field.lstrip('-') for field in ordering if self._check_field(queryset.model, field.lstrip('-'))}
+        return ordering
+
+    def order_expression(self, field, reverse=False):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        if name not in self.nullable:
+            return '-' + name if descending else name
+        return F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True)
+
+    def seek_filter(self, values, reverse=False):
+        """
+        Build `(a > x) OR (a = x AND b > y) OR ...` for the current ordering.
+
+        The leading column is also bounded on its own (`a >= x`) so the database
+        can turn the predicate into an index range scan. In nullable columns NULL
+        compares greater than every value.
+        """
+        condition = Q()
+        equal = Q()
+        bound = None
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            if name not in self.nullable:
+                after = Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): value})
+                same = Q(**{name: value})
+                at_or_after = Q(**{'%s__%s' % (name, 'lte' if descending else 'gte'): value})
+            elif value is None:
+                # Nothing comes after NULL ascending; every value does descending.
+                after = Q(**{'%s__isnull' % name: False}) if descending else Q(pk__in=[])
+                same = Q(**{'%s__isnull' % name: True})
+                at_or_after = Q() if descending else same
+            elif descending:
+                after = Q(**{'%s__lt' % name: value})
+                same = Q(**{name: value})
+                at_or_after = Q(**{'%s__lte' % name: value})
+            else:
+                after = Q(**{'%s__gt' % name: value}) | Q(**{'%s__isnull' % name: True})
+                same = Q(**{name: value})
+                at_or_after = Q(**{'%s__gte' % name: value}) | Q(**{'%s__isnull' % name: True})
+            condition |= equal & after
+            equal &= same
+            if bound is None:
+                bound = at_or_after
+        return bound & condition
+
+    def get_position(self, row):
+        return [self._value(row, field.lstrip('-')) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor('n', self.last_position)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            # Empty page after the last row: step back from the cursor we were given.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor('p', self.first_position)
+
+    def encode_cursor(self, direction, position):
+        return replace_query_param(self.base_url, self.cursor_query_param, self.make_token(direction, position))
+
+    @staticmethod
+    def make_token(direction, position):
+        payload = json.dumps({'d': direction, 'v': position}, separators=(',', ':'))
+        return b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(b64decode(token.encode('ascii')).decode('utf-8'))
+            if cursor['d'] not in ('n', 'p') or len(cursor['v']) != len(self.ordering):
+                raise ValueError(token)
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def to_html(self):
+        return ''
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        for part in name.split('__'):
+            row = getattr(row, part)
+        return row
+
+    @staticmethod
+    def _check_field(model, name):
+        """
+        Return whether `name` can be NULL. Expressions and unknown names cannot
+        be used to build a seek predicate.
+        """
+        nullable = False
+        try:
+            for part in name.split('__'):
+                field = model._meta.get_field(part)
+                nullable = nullable or field.null
+                model = field.related_model or model
+        except FieldDoesNotExist:
+            raise NotFound('Cannot paginate on "%s"' % name)
+        return nullable
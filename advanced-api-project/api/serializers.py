@@ -1,21 +1,91 @@
-# BookSerializer: Serializes all fields of the Book model and validates the publication year.
 from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnList
 from .models import Book, Author
 
-class BookSerializer(serializers.ModelSerializer):
+# SparseFieldsMixin: Accepts `fields=[...]` and drops every other field (used for `?fields=`/`?exclude=`).
+class SparseFieldsMixin:
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+# IncludedRelationsMixin: Replaces related primary keys with the objects the view loaded for `?include=`.
+class IncludedRelationsMixin:
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        return embed_included(data, self.context.get('included'))
+
+
+def embed_included(row, included):
+    """
+    `included` maps a field name to `{pk: serialized object}`, loaded once for the whole page.
+    """
+    if not included:
+        return row
+    row = dict(row)
+    for name, objects in included.items():
+        if row.get(name) is not None:
+            row[name] = objects.get(row[name])
+    return row
+
+# BookSerializer: Serializes all fields of the Book model and validates the publication year.
+class BookSerializer(IncludedRelationsMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = ['id', 'title', 'publication_year', 'author']
+        fields = ['id', 'title', 'publication_year', 'author', 'version']
+        # Bumped by Book.save(); clients send it back (or the ETag in If-Match) to update.
+        read_only_fields = ['version']
 
     def validate_publication_year(self, value):
         if value > 2023:
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
 
+# BookValuesSerializer: Read-only fast path for lists. Produces exactly the JSON of
+# BookSerializer(many=True) from `values()` rows, without building model instances
+# or running per-field to_representation. `values('author')` already yields the author id.
+class BookValuesSerializer:
+    fields = ('id', 'title', 'publication_year', 'author', 'version')
+
+    def __init__(self, instance=None, many=True, fields=None, context=None, **kwargs):
+        self.instance = instance
+        self.selected = fields
+        self.included = (context or {}).get('included')
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.fields)
+
+    @property
+    def data(self):
+        rows = self.instance
+        if self.selected is not None:
+            # Rows may carry extra columns (e.g. the ordering read by the paginator).
+            rows = [{name: row[name] for name in self.selected} for row in rows]
+        if self.included:
+            rows = [embed_included(row, self.included) for row in rows]
+        return ReturnList(rows, serializer=self)
+
+# BookBulkSerializer: Validates one item of a bulk request. The author is taken as a plain id so the
+# bulk views can check every author with a single `in_bulk` query instead of one lookup per item.
+class BookBulkSerializer(BookSerializer):
+    id = serializers.IntegerField(required=False)
+    author = serializers.IntegerField()
+
+# AuthorSummarySerializer: The author embedded in a book by `?include=author`.
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['id', 'name']
+
 # AuthorSerializer: Serializes the Author model and includes nested BookSerializer for related books.
-class AuthorSerializer(serializers.ModelSerializer):
-    books = BookSerializer(many=True, read_only=True)
+# The author views prefetch a capped `recent_books` list; `book_count` and `latest_publication_year`
+# are maintained from Book writes and cannot be set by clients.
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    books = BookSerializer(source='recent_books', many=True, read_only=True)
 
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
\ No newline at end of file
+        fields = ['id', 'name', 'book_count', 'latest_publication_year', 'books']
+        read_only_fields = ['book_count', 'latest_publication_year']
\ No newline at end of file
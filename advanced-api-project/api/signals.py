@@ -0,0 +1,70 @@
+# Signal receivers that keep derived data (response cache, autocomplete index, statistics) in sync
+# with Book and Author writes.
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .autocomplete import index as autocomplete_index
+from .cache import invalidate_model
+from .models import Author, Book
+from .stats import apply_book_deltas, book_deltas
+
+# Sent by the bulk views, since bulk_create/bulk_update do not send post_save.
+# Arguments: `created` and `updated`, lists of Book instances.
+books_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_response_cache(sender, **kwargs):
+    invalidate_model(sender)
+
+
+@receiver(books_bulk_changed)
+def invalidate_response_cache_after_bulk(sender, **kwargs):
+    invalidate_model(Book)
+
+
+# The index only learns about committed rows; a rolled-back write never reaches it.
+def autocomplete_on_commit(kind, changes):
+    transaction.on_commit(lambda: autocomplete_index.apply(kind, changes))
+
+
+@receiver(post_save, sender=Book)
+def autocomplete_book_saved(sender, instance, **kwargs):
+    autocomplete_on_commit('book', [(instance.pk, instance.title)])
+
+
+@receiver(post_save, sender=Author)
+def autocomplete_author_saved(sender, instance, **kwargs):
+    autocomplete_on_commit('author', [(instance.pk, instance.name)])
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def autocomplete_deleted(sender, instance, **kwargs):
+    autocomplete_on_commit('book' if sender is Book else 'author', [(instance.pk, None)])
+
+
+@receiver(books_bulk_changed)
+def autocomplete_books_bulk_changed(sender, created, updated, **kwargs):
+    autocomplete_on_commit('book', [(book.pk, book.title) for book in created + updated])
+
+
+@receiver(post_save, sender=Book)
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    apply_book_deltas(book_deltas(created=[instance]) if created else book_deltas(updated=[instance]))
+
+
+@receiver(post_delete, sender=Book)
+def update_stats_on_delete(sender, instance, **kwargs):
+    apply_book_deltas(book_deltas(deleted=[instance]))
+
+
+@receiver(books_bulk_changed)
+def update_stats_after_bulk(sender, created, updated, **kwargs):
+    apply_book_deltas(book_deltas(created=created, updated=updated))
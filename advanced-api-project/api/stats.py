@@ -0,0 +1,140 @@
+# Incrementally maintained book statistics: books per publication year (a summary table) and
+# Author.book_count / Author.latest_publication_year, adjusted with F() expressions on every
+# book write, so the dashboard and the author endpoints never run a GROUP BY over Book.
+from collections import Counter, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Author, Book, PublicationYearStat
+
+# years / authors: count deltas. raised: author -> highest year added (a cheap GREATEST);
+# recompute: authors whose latest year may have gone down (re-read with a MAX subquery).
+BookDeltas = namedtuple('BookDeltas', 'years authors raised recompute')
+
+
+def book_deltas(created=(), deleted=(), updated=()):
+    """
+    Return the BookDeltas for a set of Book changes.
+    Updated books are compared with the values they were loaded with.
+    """
+    years, authors, raised, recompute = Counter(), Counter(), {}, set()
+
+    def add(book):
+        years[book.publication_year] += 1
+        authors[book.author_id] += 1
+        raised[book.author_id] = max(raised.get(book.author_id, book.publication_year), book.publication_year)
+
+    def remove(year, author_id):
+        years[year] -= 1
+        authors[author_id] -= 1
+        recompute.add(author_id)
+
+    for book in created:
+        add(book)
+    for book in deleted:
+        remove(book.publication_year, book.author_id)
+    for book in updated:
+        previous = getattr(book, '_loaded_values', None) or {}
+        if 'publication_year' not in previous or 'author_id' not in previous:
+            previous = Book.objects.filter(pk=book.pk).values('publication_year', 'author_id').first()
+        if previous and (previous['publication_year'], previous['author_id']) != (book.publication_year, book.author_id):
+            remove(previous['publication_year'], previous['author_id'])
+            add(book)
+    return BookDeltas(years, authors, raised, recompute)
+
+
+def latest_year_subquery():
+    return Subquery(
+        Book.objects.filter(author=OuterRef('pk')).order_by()
+        .values('author').annotate(latest=Max('publication_year')).values('latest')[:1],
+        output_field=IntegerField(),
+    )
+
+
+def _adjust_years(deltas):
+    deltas = {year: delta for year, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Create missing rows for years that gain books, then one UPDATE however many years changed.
+    PublicationYearStat.objects.bulk_create(
+        [PublicationYearStat(publication_year=year) for year, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    increment = Case(*[When(publication_year=year, then=Value(delta)) for year, delta in deltas.items()])
+    PublicationYearStat.objects.filter(publication_year__in=list(deltas)).update(book_count=F('book_count') + increment)
+
+
+def _adjust_authors(deltas):
+    counts = {author_id: delta for author_id, delta in deltas.authors.items() if delta}
+    affected = set(counts) | set(deltas.raised) | deltas.recompute
+    if not affected:
+        return
+    # GREATEST reads the row's current value, so concurrent inserts cannot lower it; a
+    # decrease needs the MAX subquery (and is reconciled by rebuild_book_stats if it races).
+    latest = [When(pk=author_id, then=latest_year_subquery()) for author_id in deltas.recompute]
+    latest += [
+        When(pk=author_id, then=Greatest(Coalesce(F('latest_publication_year'), Value(year)), Value(year)))
+        for author_id, year in deltas.raised.items() if author_id not in deltas.recompute
+    ]
+    changes = {'latest_publication_year': Case(*latest, default=F('latest_publication_year'))}
+    if counts:
+        increment = Case(*[When(pk=author_id, then=Value(delta)) for author_id, delta in counts.items()], default=Value(0))
+        changes['book_count'] = F('book_count') + increment
+    # One UPDATE for every author touched; authors being deleted simply match no row.
+    Author.objects.filter(pk__in=affected).update(**changes)
+
+
+def apply_book_deltas(deltas):
+    with transaction.atomic():
+        _adjust_years(deltas.years)
+        _adjust_authors(deltas)
+
+
+def full_aggregates():
+    years = {
+        row['publication_year']: row['count']
+        for row in Book.objects.values('publication_year').annotate(count=Count('id')).order_by()
+    }
+    authors = {
+        row['author']: (row['count'], row['latest'])
+        for row in Book.objects.values('author').annotate(count=Count('id'), latest=Max('publication_year')).order_by()
+    }
+    return years, authors
+
+
+def rebuild_summaries():
+    years, _ = full_aggregates()
+    book_count = Subquery(
+        Book.objects.filter(author=OuterRef('pk')).order_by().values('author').annotate(count=Count('id')).values('count')[:1],
+        output_field=IntegerField(),
+    )
+    with transaction.atomic():
+        PublicationYearStat.objects.all().delete()
+        PublicationYearStat.objects.bulk_create(
+            PublicationYearStat(publication_year=year, book_count=count) for year, count in years.items()
+        )
+        Author.objects.update(book_count=Coalesce(book_count, Value(0)), latest_publication_year=latest_year_subquery())
+
+
+def verify_summaries():
+    """
+    Compare the summaries with a full aggregate; return a list of mismatch descriptions.
+    """
+    expected_years, expected_authors = full_aggregates()
+    stored_years = dict(PublicationYearStat.objects.filter(book_count__gt=0).values_list('publication_year', 'book_count'))
+    stored_authors = {
+        pk: (count, latest)
+        for pk, count, latest in Author.objects.filter(Q(book_count__gt=0) | Q(latest_publication_year__isnull=False))
+        .values_list('pk', 'book_count', 'latest_publication_year')
+    }
+    mismatches = []
+    for label, expected, stored, empty in [
+        ('publication_year', expected_years, stored_years, 0),
+        ('author', expected_authors, stored_authors, (0, None)),
+    ]:
+        for key in sorted(set(expected) | set(stored)):
+            if expected.get(key, empty) != stored.get(key, empty):
+                mismatches.append('%s %s: summary %s, actual %s' % (label, key, stored.get(key, empty), expected.get(key, empty)))
+    return mismatches
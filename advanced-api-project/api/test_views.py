@@ -1,9 +1,10 @@
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
-from .models import Book
+from .models import Author, Book
 
 
 class BookAPITestCase(APITestCase):
@@ -13,6 +14,8 @@ class BookAPITestCase(APITestCase):
         """
         Set up test data and authentication
         """
+        cache.clear()
+
         # Create test users
         self.admin_user = User.objects.create_superuser(
             username='admin',
@@ -24,193 +27,197 @@ class BookAPITestCase(APITestCase):
             email='user@example.com',
             password='user123'
         )
-        
-        # Create initial books
+
+        # Create initial authors and books
+        self.author1 = Author.objects.create(name='Author 1')
+        self.author2 = Author.objects.create(name='Author 2')
         self.book1 = Book.objects.create(
             title='Test Book 1',
-            author='Author 1',
-            publication_date='2023-01-01',
-            isbn='1234567890123',
-            price=19.99
+            publication_year=2001,
+            author=self.author1
         )
         self.book2 = Book.objects.create(
             title='Test Book 2',
-            author='Author 2',
-            publication_date='2023-02-01',
-            isbn='1234567890124',
-            price=29.99
+            publication_year=2010,
+            author=self.author2
         )
-        
+
         # Set up API client
         self.client = APIClient()
-        
+
         # API endpoints
         self.book_list_url = reverse('book-list')
+        self.book_create_url = reverse('book-create')
+        self.book_update_url = reverse('book-update')
+        self.book_delete_url = reverse('book-delete')
         self.book_detail_url = lambda pk: reverse('book-detail', kwargs={'pk': pk})
-    
+
     def test_get_book_list(self):
         """Test retrieving a list of books"""
         response = self.client.get(self.book_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-    
+        self.assertEqual(len(response.data['results']), 2)
+
     def test_get_book_detail(self):
         """Test retrieving a specific book"""
         response = self.client.get(self.book_detail_url(self.book1.pk))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['title'], 'Test Book 1')
-        self.assertEqual(response.data['author'], 'Author 1')
-    
+        self.assertEqual(response.data['author'], self.author1.pk)
+
     def test_create_book_authenticated(self):
         """Test creating a book with authentication"""
         # Use the login method explicitly
         self.client.login(username='admin', password='admin123')
-        
+
         new_book_data = {
             'title': 'New Test Book',
-            'author': 'New Author',
-            'publication_date': '2023-03-01',
-            'isbn': '1234567890125',
-            'price': 39.99
+            'publication_year': 2020,
+            'author': self.author1.pk
         }
-        response = self.client.post(self.book_list_url, new_book_data, format='json')
+        response = self.client.post(self.book_create_url, new_book_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(response.data['title'], 'New Test Book')
+        self.assertEqual(response.data['data']['title'], 'New Test Book')
         self.assertEqual(Book.objects.count(), 3)
-    
+
     def test_create_book_unauthenticated(self):
         """Test creating a book without authentication"""
         new_book_data = {
             'title': 'Unauthorized Book',
-            'author': 'Unauthorized Author',
-            'publication_date': '2023-03-01',
-            'isbn': '1234567890126',
-            'price': 39.99
+            'publication_year': 2020,
+            'author': self.author1.pk
         }
-        response = self.client.post(self.book_list_url, new_book_data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(self.book_create_url, new_book_data, format='json')
+        # SessionAuthentication sends no WWW-Authenticate challenge, so DRF answers 403.
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Book.objects.count(), 2)  # No new book added
-    
+
+    def test_create_book_future_year(self):
+        """Test that the publication year cannot be in the future"""
+        self.client.login(username='admin', password='admin123')
+        response = self.client.post(self.book_create_url, {
+            'title': 'Future Book',
+            'publication_year': 2999,
+            'author': self.author1.pk
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('publication_year', response.data)
+
     def test_update_book(self):
         """Test updating a book"""
         # Use the login method explicitly
         self.client.login(username='admin', password='admin123')
-        
+
         updated_data = {
+            'id': self.book1.pk,
             'title': 'Updated Book Title',
-            'price': 24.99
+            'publication_year': 2002,
+            'author': self.author1.pk
         }
-        response = self.client.patch(self.book_detail_url(self.book1.pk), updated_data, format='json')
+        response = self.client.put(self.book_update_url, updated_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['title'], 'Updated Book Title')
-        
+        self.assertEqual(response.data['data']['title'], 'Updated Book Title')
+
         # Verify in database
         self.book1.refresh_from_db()
         self.assertEqual(self.book1.title, 'Updated Book Title')
-    
+
     def test_delete_book(self):
         """Test deleting a book"""
         # Use the login method explicitly
         self.client.login(username='admin', password='admin123')
-        
-        response = self.client.delete(self.book_detail_url(self.book1.pk))
+
+        response = self.client.delete(self.book_delete_url, {'id': self.book1.pk}, format='json')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Book.objects.count(), 1)
-    
+
     def test_filter_books(self):
         """Test filtering books by various parameters"""
         # Create additional books for filtering
+        python_author = Author.objects.create(name='Python Author')
         Book.objects.create(
             title='Python Book',
-            author='Python Author',
-            publication_date='2023-04-01',
-            isbn='1234567890127',
-            price=49.99
+            publication_year=2010,
+            author=python_author
         )
-        
+
         # Test filtering by title
-        response = self.client.get(f"{self.book_list_url}?title__icontains=python")
+        response = self.client.get(self.book_list_url, {'title': 'Python Book'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Python Book')
-        
-        # Test filtering by price range
-        response = self.client.get(f"{self.book_list_url}?price__gte=25")
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Python Book')
+
+        # Test filtering by publication year
+        response = self.client.get(self.book_list_url, {'publication_year': 2010})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        
+        self.assertEqual(len(response.data['results']), 2)
+
         # Test multiple filters
-        response = self.client.get(f"{self.book_list_url}?author__icontains=author&price__lt=30")
+        response = self.client.get(self.book_list_url, {'author__name': 'Python Author', 'publication_year': 2010})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-    
+        self.assertEqual(len(response.data['results']), 1)
+
     def test_ordering_books(self):
         """Test ordering books by various fields"""
-        # Test ordering by price ascending
-        response = self.client.get(f"{self.book_list_url}?ordering=price")
+        # Test ordering by publication year ascending
+        response = self.client.get(self.book_list_url, {'ordering': 'publication_year'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        prices = [float(book['price']) for book in response.data]
-        self.assertEqual(prices, sorted(prices))
-        
-        # Test ordering by price descending
-        response = self.client.get(f"{self.book_list_url}?ordering=-price")
+        years = [book['publication_year'] for book in response.data['results']]
+        self.assertEqual(years, sorted(years))
+
+        # Test ordering by publication year descending
+        response = self.client.get(self.book_list_url, {'ordering': '-publication_year'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        prices = [float(book['price']) for book in response.data]
-        self.assertEqual(prices, sorted(prices, reverse=True))
-        
+        years = [book['publication_year'] for book in response.data['results']]
+        self.assertEqual(years, sorted(years, reverse=True))
+
         # Test ordering by title
-        response = self.client.get(f"{self.book_list_url}?ordering=title")
+        response = self.client.get(self.book_list_url, {'ordering': 'title'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [book['title'] for book in response.data]
+        titles = [book['title'] for book in response.data['results']]
         self.assertEqual(titles, sorted(titles))
-    
+
     def test_search_books(self):
         """Test searching books"""
-        # Assuming you have a search filter set up in your viewset
         Book.objects.create(
             title='Django for Beginners',
-            author='Author 3',
-            publication_date='2023-05-01',
-            isbn='1234567890128',
-            price=34.99
+            publication_year=2018,
+            author=Author.objects.create(name='Author 3')
         )
-        
+
         # Test search by title
-        response = self.client.get(f"{self.book_list_url}?search=django")
+        response = self.client.get(self.book_list_url, {'search': 'django'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Django for Beginners')
-        
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Django for Beginners')
+
         # Test search by author
-        response = self.client.get(f"{self.book_list_url}?search=author")
+        response = self.client.get(self.book_list_url, {'search': 'author'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(response.data) >= 3)
-    
+        self.assertTrue(len(response.data['results']) >= 3)
+
     def test_permissions(self):
         """Test permission controls"""
         # Unauthenticated user should be able to list books
         response = self.client.get(self.book_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        
+
         # Unauthenticated user should not be able to create a book
         new_book_data = {
             'title': 'Permission Test Book',
-            'author': 'Permission Test Author',
-            'publication_date': '2023-06-01',
-            'isbn': '1234567890129',
-            'price': 19.99
+            'publication_year': 2015,
+            'author': self.author1.pk
         }
-        response = self.client.post(self.book_list_url, new_book_data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        
-        # Regular user may or may not have permission to create a book
+        response = self.client.post(self.book_create_url, new_book_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # Any authenticated user may create a book (IsAuthenticated)
         # Use the login method explicitly for regular user
         self.client.login(username='user', password='user123')
-        
-        response = self.client.post(self.book_list_url, new_book_data, format='json')
-        # This assumes regular users can't create books - adjust based on your permissions
-        self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_201_CREATED])
-        
+
+        response = self.client.post(self.book_create_url, new_book_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
         # Regular user should be able to view books
         response = self.client.get(self.book_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -218,19 +225,19 @@ class BookAPITestCase(APITestCase):
 
 class TestDatabaseConfiguration(TestCase):
     """Test to ensure a separate test database is configured"""
-    
+
     def test_using_test_database(self):
         """Test that we are using a test database"""
         from django.conf import settings
-        
+
         # Check if TEST configuration exists
         self.assertTrue(hasattr(settings, 'DATABASES'))
-        
+
         # Check if Django is using the test database
         # During tests, Django automatically uses a test database
         db_name = settings.DATABASES['default']['NAME']
         self.assertTrue(
-            db_name == ':memory:' or 
-            db_name.endswith('_test') or 
+            db_name == ':memory:' or
+            db_name.endswith('_test') or
             settings.DATABASES['default'].get('TEST', {}).get('NAME') is not None
         )
@@ -1 +1,1100 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
 
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from observability.metrics import Registry, registry
+
+from . import autocomplete
+from .autocomplete import index as autocomplete_index
+from .cache import reset_stats as reset_cache_stats
+from .index_advisor import advise, declared_views, suggested_migrations
+from .models import Author, Book, PublicationYearStat
+from .serializers import BookSerializer, BookValuesSerializer
+from .stats import rebuild_summaries, verify_summaries
+from .views import AsyncBookDetailView
+
+
+class KeysetPaginationTestCase(APITestCase):
+    """Cursor pagination of the book list"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name='Chinua Achebe')
+        # Duplicate titles and years make sure the id tie-breaker is exercised.
+        for title, year in [('B', 1990), ('A', 1958), ('B', 1960), ('C', 1958), ('A', 1990)]:
+            Book.objects.create(title=title, publication_year=year, author=self.author)
+        self.url = reverse('book-list')
+
+    def walk(self, params):
+        """Follow `next` links and return every id in order."""
+        response = self.client.get(self.url, params)
+        ids = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(book['id'] for book in response.data['results'])
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_pages_cover_every_ordering_without_gaps(self):
+        for ordering in ['title', '-title', 'publication_year', '-publication_year', 'title,-publication_year']:
+            fields = ordering.split(',')
+            tie_breaker = '-id' if fields[0].startswith('-') else 'id'
+            expected = list(Book.objects.order_by(*fields, tie_breaker).values_list('id', flat=True))
+            self.assertEqual(self.walk({'ordering': ordering, 'page_size': 2}), expected, ordering)
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get(self.url, {'ordering': 'title', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_page_is_a_single_seek_query(self):
+        first = self.client.get(self.url, {'page_size': 2})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        # The other query is the ETag aggregate of ConditionalListMixin.
+        page_queries = [query['sql'] for query in queries if 'LIMIT' in query['sql']]
+        self.assertEqual(len(page_queries), 1)
+        self.assertNotIn('OFFSET', page_queries[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AuthorEndpointsTestCase(APITestCase):
+    """Author list/detail with prefetched, capped nested books"""
+
+    def create_authors(self, count, books_each=3):
+        for i in range(count):
+            author = Author.objects.create(name='Author %02d' % i)
+            Book.objects.bulk_create(
+                Book(title='Book %d-%d' % (i, j), publication_year=1950 + j, author=author)
+                for j in range(books_each)
+            )
+        # bulk_create sends no signals; bring the denormalized counters up to date.
+        rebuild_summaries()
+
+    def test_list_query_count_is_constant(self):
+        self.create_authors(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('author-list'))
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.create_authors(15)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('author-list'), {'page_size': 18})
+        self.assertEqual(len(response.data['results']), 18)
+
+    def test_nested_books_are_capped(self):
+        self.create_authors(1, books_each=15)
+        author = Author.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('author-detail', kwargs={'pk': author.pk}), {'books_limit': 5})
+        self.assertEqual(response.data['book_count'], 15)
+        self.assertEqual([book['publication_year'] for book in response.data['books']], [1964, 1963, 1962, 1961, 1960])
+
+        response = self.client.get(reverse('author-detail', kwargs={'pk': author.pk}), {'books_limit': 0})
+        self.assertEqual(response.data['books'], [])
+
+    def test_nested_books_match_book_serializer(self):
+        self.create_authors(1, books_each=1)
+        book = Book.objects.get()
+        response = self.client.get(reverse('author-list'))
+        nested = response.data['results'][0]['books'][0]
+        self.assertEqual(nested, self.client.get(reverse('book-detail', kwargs={'pk': book.pk})).data)
+
+
+class BookBulkTestCase(APITestCase):
+    """Bulk create / update / delete endpoints"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sync', password='sync123')
+        self.client.force_authenticate(self.user)
+        self.authors = [Author.objects.create(name='Author %d' % i) for i in range(3)]
+
+    def test_bulk_create_validates_authors_in_one_query(self):
+        items = [
+            {'title': 'Book %d' % i, 'publication_year': 2000 + i, 'author': self.authors[i % 3].pk}
+            for i in range(10)
+        ]
+        # Savepoint + author lookup + batched inserts, then (inside a savepoint) insert-if-missing
+        # and UPDATE for the year summary and one UPDATE of the author counters; nothing grows with the items.
+        with self.assertNumQueries(11):
+            response = self.client.post(reverse('book-bulk-create') + '?batch_size=4', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Book.objects.count(), 10)
+        self.assertEqual([result['data']['title'] for result in response.data['results']], [item['title'] for item in items])
+
+    def test_bulk_create_is_all_or_nothing(self):
+        items = [
+            {'title': 'Good', 'publication_year': 2000, 'author': self.authors[0].pk},
+            {'title': 'Bad author', 'publication_year': 2000, 'author': 9999},
+            {'title': 'Bad year', 'publication_year': 2999, 'author': self.authors[0].pk},
+        ]
+        response = self.client.post(reverse('book-bulk-create'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.data['results']], ['valid', 'invalid', 'invalid'])
+        self.assertIn('author', response.data['results'][1]['errors'])
+        self.assertIn('publication_year', response.data['results'][2]['errors'])
+        self.assertFalse(Book.objects.exists())
+
+    def test_bulk_update_and_delete(self):
+        books = [Book.objects.create(title='Old %d' % i, publication_year=1990, author=self.authors[0]) for i in range(3)]
+        response = self.client.patch(reverse('book-bulk-update'), [
+            {'id': books[0].pk, 'title': 'New 0'},
+            {'id': books[1].pk, 'author': self.authors[1].pk},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        books[0].refresh_from_db()
+        books[1].refresh_from_db()
+        self.assertEqual(books[0].title, 'New 0')
+        self.assertEqual(books[1].author, self.authors[1])
+
+        response = self.client.put(reverse('book-bulk-update'), [{'id': 9999, 'title': 'x', 'publication_year': 2000, 'author': self.authors[0].pk}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.delete(reverse('book-bulk-delete'), [books[0].pk, books[2].pk, 9999], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], ['deleted', 'deleted', 'not_found'])
+        self.assertEqual(list(Book.objects.values_list('id', flat=True)), [books[1].pk])
+
+    def test_bulk_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(reverse('book-bulk-create'), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ResponseCacheTestCase(APITestCase):
+    """Versioned response cache of the book list"""
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.author = Author.objects.create(name='Ngugi wa Thiongo')
+        self.book = Book.objects.create(title='Weep Not, Child', publication_year=1964, author=self.author)
+        self.url = reverse('book-list')
+
+    def test_identical_queries_are_served_from_cache(self):
+        first = self.client.get(self.url, {'ordering': 'title', 'search': 'weep'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            # Parameter order does not matter.
+            second = self.client.get(self.url, {'search': 'weep', 'ordering': 'title'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_book_and_author_writes_invalidate(self):
+        self.client.get(self.url, {'search': 'thiongo'})
+        self.author.name = 'Ngugi'
+        self.author.save()
+        response = self.client.get(self.url, {'search': 'thiongo'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+        self.client.get(self.url)
+        self.book.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_generation_bumped_again_on_commit(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title='A Grain of Wheat', publication_year=1967, author=self.author)
+            # A reader between the write and the commit caches under the first bump...
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        # ...and the commit invalidates that entry.
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_bulk_writes_invalidate(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(User.objects.create_user(username='sync'))
+        self.client.post(reverse('book-bulk-create'), [
+            {'title': 'The River Between', 'publication_year': 1965, 'author': self.author.pk},
+        ], format='json')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_stats(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.force_authenticate(User.objects.create_superuser(username='admin', password='admin123'))
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.data, {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+
+class ConditionalRequestTestCase(APITestCase):
+    """ETag / Last-Modified validators on the book endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name='Wole Soyinka')
+        self.book = Book.objects.create(title='Ake', publication_year=1981, author=self.author)
+        self.detail_url = reverse('book-detail', kwargs={'pk': self.book.pk})
+
+    def test_detail_returns_304_for_matching_etag(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.book.title = 'Ake: The Years of Childhood'
+        self.book.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_on_insert_and_delete(self):
+        url = reverse('book-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        other = Book.objects.create(title='Death and the King\'s Horseman', publication_year=1975, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        other.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_cached_list_answers_304_without_queries(self):
+        url = reverse('book-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_honors_if_match(self):
+        self.client.force_authenticate(User.objects.create_user(username='editor'))
+        etag = self.client.get(self.detail_url)['ETag']
+        data = {'id': self.book.pk, 'title': 'Ake (2nd ed.)', 'publication_year': 1981, 'author': self.author.pk}
+
+        response = self.client.put(reverse('book-update'), data, format='json', HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.client.put(reverse('book-update'), data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AutocompleteTestCase(APITestCase):
+    """Prefix autocomplete over titles and author names"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name='Gabriel García Márquez')
+        self.books = [
+            Book.objects.create(title=title, publication_year=year, author=self.author)
+            for title, year in [
+                ('One Hundred Years of Solitude', 1967),
+                ('Love in the Time of Cholera', 1985),
+                ('Of Love and Other Demons', 1994),
+                ('Love', 1980),
+            ]
+        ]
+        self.url = reverse('autocomplete')
+        # The index is process-wide; start each test from this test's rows.
+        autocomplete_index.rebuild()
+
+    def labels(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['label'] for result in response.data['results']]
+
+    def test_ranking_and_limit(self):
+        # Exact match, then titles starting with the prefix, then word matches.
+        self.assertEqual(self.labels(q='love'), ['Love', 'Love in the Time of Cholera', 'Of Love and Other Demons'])
+        self.assertEqual(self.labels(q='LOVE', limit=1), ['Love'])
+
+    def test_accents_and_types(self):
+        self.assertEqual(self.labels(q='garcia marq'), ['Gabriel García Márquez'])
+        self.assertEqual(self.labels(q='gab', type='book'), [])
+
+    def test_type_filter_is_not_crowded_out(self):
+        Book.objects.bulk_create(
+            Book(title='The Book %03d' % i, publication_year=2000, author=self.author) for i in range(autocomplete_index.scan_limit + 100)
+        )
+        Author.objects.create(name='Theo Zed')
+        autocomplete_index.rebuild()
+        self.assertEqual(self.labels(q='the', type='author'), ['Theo Zed'])
+        self.assertEqual(len(self.labels(q='the', type='book', limit=5)), 5)
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.labels(q='one hundred'), ['One Hundred Years of Solitude'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[0].title = 'Cien años de soledad'
+            self.books[0].save()
+            # Not committed yet.
+            self.assertEqual(self.labels(q='cien'), [])
+        self.assertEqual(self.labels(q='one hundred'), [])
+        self.assertEqual(self.labels(q='cien'), ['Cien años de soledad'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books[1].delete()
+        self.assertEqual(self.labels(q='love in'), [])
+
+        self.client.force_authenticate(User.objects.create_user(username='sync'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('book-bulk-create'), [
+                {'title': 'Chronicle of a Death Foretold', 'publication_year': 1981, 'author': self.author.pk},
+            ], format='json')
+        self.assertEqual(self.labels(q='chron'), ['Chronicle of a Death Foretold'])
+
+    def test_other_process_write_rebuilds_in_background(self):
+        self.labels(q='love')
+        # Another worker wrote a row and replaced the change marker.
+        Book.objects.bulk_create([Book(title='Chronicle of a Death Foretold', publication_year=1981, author=self.author)])
+        cache.set(autocomplete.CHANGE_KEY, 'other-worker')
+        autocomplete_index._checked_at = 0.0
+        with patch.object(autocomplete_index, 'start_background_rebuild') as start:
+            # The current index keeps answering while the new one is built.
+            self.assertEqual(self.labels(q='chron'), [])
+        start.assert_called_once_with()
+
+        autocomplete_index.rebuild()
+        self.assertEqual(self.labels(q='chron'), ['Chronicle of a Death Foretold'])
+        self.assertEqual(autocomplete_index._marker, 'other-worker')
+
+    def test_writes_during_rebuild_are_replayed(self):
+        load = autocomplete_index._load
+
+        def load_then_write():
+            # Read the rows, then a local write commits before the swap.
+            fresh = load()
+            autocomplete_index.apply('book', [(self.books[0].pk, 'Cien años de soledad')])
+            return fresh
+
+        with patch.object(autocomplete_index, '_load', load_then_write):
+            autocomplete_index.rebuild()
+        self.assertEqual(self.labels(q='cien'), ['Cien años de soledad'])
+        self.assertEqual(self.labels(q='one hundred'), [])
+
+
+class FastSerializationTestCase(APITestCase):
+    """BookValuesSerializer must match BookSerializer byte for byte"""
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name='Toni Morrison')
+        for title, year in [('Beloved', 1987), ('Sula', 1973), ('Jazz', 1992), ('"Quoted" & Ünïcode ✓', 1970)]:
+            Book.objects.create(title=title, publication_year=year, author=author)
+
+    def test_serializers_render_identical_bytes(self):
+        queryset = Book.objects.order_by('title')
+        renderer = JSONRenderer()
+        slow = renderer.render(BookSerializer(queryset, many=True).data)
+        fast = renderer.render(BookValuesSerializer(list(BookValuesSerializer.values(queryset))).data)
+        self.assertEqual(fast, slow)
+
+    def test_list_endpoint_is_identical_with_fast_path(self):
+        url = reverse('book-list')
+        for params in [{}, {'ordering': '-publication_year', 'page_size': 2}, {'search': 'sula'}]:
+            slow = self.client.get(url, params)
+            cache.clear()
+            with override_settings(BOOK_LIST_FAST_SERIALIZATION=True):
+                fast = self.client.get(url, params)
+            cache.clear()
+            self.assertEqual(fast.content, slow.content, params)
+
+
+class BookExportTestCase(APITestCase):
+    """Streaming NDJSON / CSV export"""
+
+    def setUp(self):
+        self.author = Author.objects.create(name='Doris Lessing')
+        for title, year in [('The Grass Is Singing', 1950), ('The Golden Notebook', 1962), ('The Fifth Child', 1988)]:
+            Book.objects.create(title=title, publication_year=year, author=self.author)
+        self.url = reverse('book-export')
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_supports_list_filters(self):
+        response = self.client.get(self.url, {'ordering': '-publication_year', 'publication_year': 1962})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in self.content(response).decode().splitlines()]
+        self.assertEqual(lines, [{
+            'id': Book.objects.get(publication_year=1962).pk, 'title': 'The Golden Notebook',
+            'publication_year': 1962, 'author': self.author.pk, 'author_name': 'Doris Lessing',
+        }])
+
+    def test_csv_with_gzip(self):
+        response = self.client.get(self.url, {'output': 'csv', 'compress': 'gzip', 'ordering': 'title'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(self.content(response)).decode())))
+        self.assertEqual(rows[0], ['id', 'title', 'publication_year', 'author', 'author_name'])
+        self.assertEqual([row[1] for row in rows[1:]], ['The Fifth Child', 'The Golden Notebook', 'The Grass Is Singing'])
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookStatsTestCase(APITestCase):
+    """Incrementally maintained per-year / per-author statistics"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats', password='stats123')
+        self.authors = [Author.objects.create(name='Author %d' % i) for i in range(2)]
+        self.url = reverse('book-stats')
+
+    def stats(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return (
+            {row['publication_year']: row['count'] for row in response.data['books_per_year']},
+            {row['author']: row['count'] for row in response.data['books_per_author']},
+        )
+
+    def test_single_writes_keep_stats_in_sync(self):
+        first = Book.objects.create(title='One', publication_year=2000, author=self.authors[0])
+        second = Book.objects.create(title='Two', publication_year=2000, author=self.authors[0])
+        self.assertEqual(self.stats(), ({2000: 2}, {self.authors[0].pk: 2}))
+
+        second = Book.objects.get(pk=second.pk)
+        second.publication_year = 2001
+        second.author = self.authors[1]
+        second.save()
+        first.title = 'Renamed'
+        first.save()
+        self.assertEqual(self.stats(), ({2000: 1, 2001: 1}, {self.authors[0].pk: 1, self.authors[1].pk: 1}))
+
+        first.delete()
+        self.authors[1].delete()
+        self.assertEqual(self.stats(), ({}, {}))
+        self.assertEqual(verify_summaries(), [])
+
+    def test_bulk_endpoints_keep_stats_in_sync(self):
+        self.client.force_authenticate(self.user)
+        items = [{'title': 'Book %d' % i, 'publication_year': 1990 + i % 2, 'author': self.authors[0].pk} for i in range(4)]
+        self.client.post(reverse('book-bulk-create'), items, format='json')
+        ids = list(Book.objects.order_by('id').values_list('id', flat=True))
+        self.client.patch(reverse('book-bulk-update'), [{'id': ids[0], 'author': self.authors[1].pk, 'publication_year': 1995}], format='json')
+        self.client.delete(reverse('book-bulk-delete'), [ids[1]], format='json')
+        self.assertEqual(self.stats(), ({1990: 1, 1991: 1, 1995: 1}, {self.authors[0].pk: 2, self.authors[1].pk: 1}))
+        self.assertEqual(verify_summaries(), [])
+
+    def test_endpoint_reads_only_summary_tables(self):
+        for year in (1999, 2000, 2000):
+            Book.objects.create(title='Book', publication_year=year, author=self.authors[0])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'authors_limit': 1})
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('"api_book"' in query['sql'] for query in queries))
+
+    def test_rebuild_command_repairs_drift(self):
+        Book.objects.create(title='Book', publication_year=2000, author=self.authors[0])
+        PublicationYearStat.objects.update(book_count=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_book_stats', '--verify-only', stdout=io.StringIO(), stderr=io.StringIO())
+        call_command('rebuild_book_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), ({2000: 1}, {self.authors[0].pk: 1}))
+
+
+class AsyncBookViewsTestCase(APITestCase):
+    """Native async list / detail views"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name='Ngugi wa Thiongo')
+        self.books = [
+            Book.objects.create(title='Book %02d' % i, publication_year=1960 + i % 5, author=self.author)
+            for i in range(25)
+        ]
+
+    async def test_list_matches_sync_view(self):
+        query = {'ordering': '-publication_year', 'page_size': 10}
+        expected = await sync_to_async(self.client.get)(reverse('book-list'), query)
+        response = await self.async_client.get(reverse('book-list-async'), query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['results'], json.loads(expected.content)['results'])
+
+        seen = []
+        url, params = reverse('book-list-async'), {'publication_year': 1961, 'page_size': 2}
+        while url:
+            page = json.loads((await self.async_client.get(url, params)).content)
+            seen += [book['id'] for book in page['results']]
+            url, params = page['next'], {}
+        self.assertEqual(seen, [book.pk for book in self.books if book.publication_year == 1961])
+
+    async def test_detail(self):
+        response = await self.async_client.get(reverse('book-detail-async', kwargs={'pk': self.books[0].pk}))
+        self.assertEqual(json.loads(response.content), {
+            'id': self.books[0].pk, 'title': 'Book 00', 'publication_year': 1960, 'author': self.author.pk, 'version': 1,
+        })
+        response = await self.async_client.get(reverse('book-detail-async', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_errors_and_sync_permissions(self):
+        response = await self.async_client.get(reverse('book-list-async'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(json.loads(response.content), {'detail': 'Invalid cursor'})
+
+        with patch.object(AsyncBookDetailView, 'permission_classes', [IsAuthenticated]):
+            response = await self.async_client.get(reverse('book-detail-async', kwargs={'pk': self.books[0].pk}))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SparseFieldsetTestCase(APITestCase):
+    """`?fields=` / `?exclude=` on the Book and Author endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name='Wole Soyinka')
+        self.books = [
+            Book.objects.create(title='Book %d' % i, publication_year=1960 + i, author=self.author) for i in range(3)
+        ]
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [query['sql'] for query in queries]
+
+    def test_book_list_selects_only_requested_columns(self):
+        data, queries = self.get(reverse('book-list'), {'fields': 'title,id', 'ordering': '-publication_year'})
+        self.assertEqual(data['results'][0], {'id': self.books[2].pk, 'title': 'Book 2'})
+        page_query = queries[-1]
+        self.assertIn('"api_book"."publication_year"', page_query)  # keyset ordering column
+        self.assertNotIn('"api_book"."author_id"', page_query)
+        self.assertEqual(len(queries), 2)  # validators aggregate + page; no deferred loads
+
+    def test_exclude_and_fast_path(self):
+        data, _ = self.get(reverse('book-list'), {'exclude': 'author'})
+        with override_settings(BOOK_LIST_FAST_SERIALIZATION=True):
+            cache.clear()
+            fast, queries = self.get(reverse('book-list'), {'exclude': 'author'})
+        self.assertEqual(fast['results'], data['results'])
+        self.assertEqual(list(fast['results'][0]), ['id', 'title', 'publication_year', 'version'])
+        self.assertNotIn('author_id', queries[-1])
+
+    def test_book_detail_keeps_etag(self):
+        response = self.client.get(reverse('book-detail', kwargs={'pk': self.books[0].pk}), {'fields': 'title'})
+        self.assertEqual(response.data, {'title': 'Book 0'})
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_author_skips_unselected_relations(self):
+        data, queries = self.get(reverse('author-list'), {'fields': 'id,name'})
+        self.assertEqual(data['results'], [{'id': self.author.pk, 'name': 'Wole Soyinka'}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0])
+
+        response = self.client.get(reverse('author-detail', kwargs={'pk': self.author.pk}), {'exclude': 'books'})
+        self.assertEqual(response.data, {
+            'id': self.author.pk, 'name': 'Wole Soyinka', 'book_count': 3, 'latest_publication_year': 1962,
+        })
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('book-list'), {'fields': 'title,isbn'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('isbn', str(response.data['fields']))
+        response = self.client.get(reverse('author-list'), {'fields': 'id', 'exclude': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IndexAdvisorTestCase(APITestCase):
+    """EXPLAIN-based index suggestions for declared filter / search / ordering fields"""
+
+    class YearStatsView:
+        queryset = PublicationYearStat.objects.all()
+        filterset_fields = ['book_count']
+        ordering_fields = ['book_count', 'publication_year']
+
+    def test_routed_views_have_their_indexes(self):
+        findings = advise(declared_views())
+        self.assertIn(('filter', 'publication_year', 'exact'), [(f.kind, f.path, f.lookup) for f in findings])
+        self.assertEqual([f for f in findings if f.suggestion is not None], [])
+        search = next(f for f in findings if f.kind == 'search' and f.path == 'title')
+        self.assertTrue(search.full_scan)  # LIKE '%...%' is reported but never "fixed" with an index
+
+    def test_suggests_index_and_migration_for_scanned_column(self):
+        findings = advise([self.YearStatsView])
+        suggested = {(f.kind, f.path): f.suggestion for f in findings}
+        self.assertEqual(suggested[('filter', 'book_count')].fields, ['book_count', 'id'])
+        self.assertIsNone(suggested[('ordering', 'publication_year')])  # unique column, already indexed
+
+        [writer] = suggested_migrations(findings)
+        source = writer.as_string()
+        self.assertIn("migrations.AddIndex(", source)
+        self.assertIn("name='publicationyearstat_book_c_idx'", source)
+        self.assertTrue(writer.migration.name.endswith('_suggested_indexes'))
+
+
+class BookFilterTestCase(APITestCase):
+    """Range and set filters, and the query plans they compile to (SQLite)"""
+
+    def setUp(self):
+        cache.clear()
+        self.authors = [Author.objects.create(name='Author %d' % i) for i in range(3)]
+        self.books = [
+            Book.objects.create(title='Book %d' % i, publication_year=1985 + i, author=self.authors[i % 3])
+            for i in range(20)
+        ]
+
+    def page(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book['id'] for book in response.data['results']], queries[-1]['sql']
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def test_year_range_is_an_index_range_scan(self):
+        ids, sql = self.page({'publication_year__gte': 1990, 'publication_year__lte': 2000, 'ordering': 'publication_year'})
+        self.assertEqual(ids, [book.pk for book in self.books if 1990 <= book.publication_year <= 2000])
+        self.assertIn('"api_book"."publication_year" >= 1990', sql)
+        self.assertIn('"api_book"."publication_year" <= 2000', sql)
+        # Sargable range on the leading column of (publication_year, id): no scan, no sort.
+        self.assertEqual(
+            self.plan(sql), 'SEARCH api_book USING INDEX book_year_id_idx (publication_year>? AND publication_year<?)',
+        )
+
+    def test_author_and_id_sets(self):
+        wanted = self.authors[0].pk, self.authors[2].pk
+        ids, sql = self.page({'author__in': '%d,%d' % wanted})
+        self.assertEqual(ids, [book.pk for book in self.books if book.author_id in wanted])
+        self.assertIn('SEARCH api_book USING INDEX api_book_author_id', self.plan(sql))
+
+        ids, sql = self.page({'id__in': '%d,%d,%d' % (self.books[3].pk, self.books[1].pk, 9999)})
+        self.assertEqual(ids, [self.books[1].pk, self.books[3].pk])
+        self.assertIn('SEARCH api_book USING INTEGER PRIMARY KEY', self.plan(sql))
+
+    def test_invalid_values_are_rejected(self):
+        response = self.client.get(reverse('book-list'), {'id__in': '1,x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('book-list'), {'publication_year__gte': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchTestCase(APITestCase):
+    """Batch endpoint dispatching to the existing views"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='batch', password='batch123')
+        self.author = Author.objects.create(name='Chinua Achebe')
+        self.book = Book.objects.create(title='Things Fall Apart', publication_year=1958, author=self.author)
+        self.url = reverse('batch')
+
+    def test_mixed_requests_share_one_authentication(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, [
+            {'method': 'GET', 'path': reverse('book-detail', kwargs={'pk': self.book.pk}), 'query': {'fields': 'title'}},
+            {'method': 'POST', 'path': reverse('book-create'), 'body': {'title': 'Arrow of God', 'publication_year': 1964, 'author': self.author.pk}},
+            {'method': 'GET', 'path': reverse('book-list') + '?ordering=-publication_year'},
+            {'method': 'GET', 'path': reverse('book-detail-async', kwargs={'pk': self.book.pk})},
+            {'method': 'GET', 'path': '/api/nowhere/'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        detail, created, listing, async_detail, missing = response.data['results']
+        self.assertEqual(detail['body'], {'title': 'Things Fall Apart'})
+        self.assertIn('ETag', detail['headers'])
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual([book['title'] for book in listing['body']['results']], ['Arrow of God', 'Things Fall Apart'])
+        self.assertEqual(async_detail['body']['title'], 'Things Fall Apart')
+        self.assertEqual(missing['status'], status.HTTP_404_NOT_FOUND)
+
+    def test_sub_requests_keep_their_permissions(self):
+        response = self.client.post(self.url, [
+            {'method': 'GET', 'path': reverse('book-detail', kwargs={'pk': self.book.pk})},
+            {'method': 'POST', 'path': reverse('book-create'), 'body': {'title': 'x', 'publication_year': 2000, 'author': self.author.pk}},
+            {'method': 'POST', 'path': self.url, 'body': []},
+        ], format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [200, 403, 404])
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        self.client.force_authenticate(self.user)
+        cached = self.client.get(reverse('book-list'))
+        response = self.client.post(self.url, {'atomic': True, 'requests': [
+            {'method': 'POST', 'path': reverse('book-create'), 'body': {'title': 'No Longer at Ease', 'publication_year': 1960, 'author': self.author.pk}},
+            {'method': 'GET', 'path': reverse('book-list')},
+            {'method': 'PUT', 'path': reverse('book-update'), 'body': {'id': 9999, 'title': 'x', 'publication_year': 2000, 'author': self.author.pk}},
+            {'method': 'GET', 'path': reverse('book-list')},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 200, 404, 424])
+        self.assertEqual(Book.objects.count(), 1)
+        # The list cached inside the rolled-back transaction is not served afterwards.
+        after = self.client.get(reverse('book-list'))
+        self.assertEqual(after.data['results'], cached.data['results'])
+
+    def test_malformed_items_are_rejected(self):
+        path = reverse('book-list')
+        response = self.client.post(self.url, [
+            {'path': path, 'query': [1, 2]},
+            {'path': path, 'headers': ['X-Test']},
+            {'path': path, 'body': 'title=x'},
+            {'path': path, 'query': {'page_size': 1}, 'headers': {'Accept-Language': 'en'}},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], [400, 400, 400, 200])
+        self.assertEqual(response.data['results'][0]['body'], {'error': 'query must be an object.'})
+
+        response = self.client.post(self.url, {'atomic': 'false', 'requests': [{'path': path}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejects_oversized_batches(self):
+        response = self.client.post(self.url, [{'path': '/api/books/'}] * 51, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IncludeTestCase(APITestCase):
+    """`?include=` relationship embedding with one query per relation"""
+
+    def setUp(self):
+        cache.clear()
+        self.authors = [Author.objects.create(name='Author %d' % i) for i in range(5)]
+        for i in range(20):
+            Book.objects.create(title='Book %02d' % i, publication_year=1990 + i, author=self.authors[i % 5])
+
+    def test_list_loads_authors_once_per_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-list'), {'include': 'author', 'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Validators aggregate, page, one in_bulk for every author on the page.
+        self.assertEqual(len(queries), 3)
+        book = response.data['results'][0]
+        self.assertEqual(book['author'], {'id': self.authors[0].pk, 'name': 'Author 0'})
+
+        with override_settings(BOOK_LIST_FAST_SERIALIZATION=True):
+            cache.clear()
+            fast = self.client.get(reverse('book-list'), {'include': 'author', 'page_size': 10})
+        self.assertEqual(JSONRenderer().render(fast.data), JSONRenderer().render(response.data))
+
+    def test_detail_and_sparse_fields(self):
+        book = Book.objects.first()
+        response = self.client.get(reverse('book-detail', kwargs={'pk': book.pk}), {'include': 'author'})
+        self.assertEqual(response.data['author']['name'], book.author.name)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('book-detail', kwargs={'pk': book.pk}), {'include': 'author', 'fields': 'title'})
+        self.assertEqual(response.data, {'title': book.title})
+
+    def test_validators_follow_included_authors(self):
+        book = Book.objects.first()
+        urls = [reverse('book-detail', kwargs={'pk': book.pk}), reverse('book-list')]
+        etags = {}
+        for url in urls:
+            response = self.client.get(url, {'include': 'author'})
+            self.assertFalse(response.has_header('Last-Modified'))
+            etags[url] = response['ETag']
+            response = self.client.get(url, {'include': 'author'}, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        plain = self.client.get(urls[0])['ETag']
+
+        author = Author.objects.get(pk=book.author_id)
+        author.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+
+        response = self.client.get(urls[0], {'include': 'author'}, HTTP_IF_NONE_MATCH=etags[urls[0]])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['author']['name'], 'Renamed')
+        response = self.client.get(urls[1], {'include': 'author'}, HTTP_IF_NONE_MATCH=etags[urls[1]])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Renamed', [row['author']['name'] for row in response.data['results']])
+        # Without includes the book's own validators still apply.
+        response = self.client.get(urls[0], HTTP_IF_NONE_MATCH=plain)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_author_endpoints_accept_books(self):
+        response = self.client.get(reverse('author-detail', kwargs={'pk': self.authors[0].pk}), {'include': 'books'})
+        self.assertEqual(len(response.data['books']), 4)
+
+    def test_unknown_relation(self):
+        response = self.client.get(reverse('book-list'), {'include': 'publisher'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('publisher', str(response.data['include']))
+
+
+class AuthorCountersTestCase(APITestCase):
+    """Denormalized Author.book_count / latest_publication_year"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='counters', password='counters123')
+        self.authors = [Author.objects.create(name='Author %d' % i) for i in range(3)]
+
+    def counters(self):
+        return {
+            author.pk: (author.book_count, author.latest_publication_year)
+            for author in Author.objects.order_by('pk')
+        }
+
+    def test_single_writes(self):
+        first, second = self.authors[:2]
+        old = Book.objects.create(title='Old', publication_year=1990, author=first)
+        new = Book.objects.create(title='New', publication_year=2005, author=first)
+        self.assertEqual(self.counters()[first.pk], (2, 2005))
+
+        new.author = second
+        new.save()
+        self.assertEqual(self.counters()[first.pk], (1, 1990))
+        self.assertEqual(self.counters()[second.pk], (1, 2005))
+
+        old.publication_year = 1980
+        old.save()
+        old.delete()
+        self.assertEqual(self.counters()[first.pk], (0, None))
+        self.assertEqual(verify_summaries(), [])
+
+    def test_bulk_writes_update_each_author_once(self):
+        self.client.force_authenticate(self.user)
+        items = [{'title': 'B%d' % i, 'publication_year': 2000 + i, 'author': self.authors[i % 2].pk} for i in range(6)]
+        self.client.post(reverse('book-bulk-create'), items, format='json')
+        self.assertEqual(self.counters()[self.authors[0].pk], (3, 2004))
+        self.assertEqual(self.counters()[self.authors[1].pk], (3, 2005))
+
+        newest = Book.objects.get(publication_year=2005)
+        self.client.patch(reverse('book-bulk-update'), [{'id': newest.pk, 'author': self.authors[2].pk}], format='json')
+        self.client.delete(reverse('book-bulk-delete'), [Book.objects.get(publication_year=2004).pk], format='json')
+        self.assertEqual(self.counters(), {
+            self.authors[0].pk: (2, 2002), self.authors[1].pk: (2, 2003), self.authors[2].pk: (1, 2005),
+        })
+        self.assertEqual(verify_summaries(), [])
+
+    def test_author_list_orders_and_filters_without_join(self):
+        for i, author in enumerate(self.authors):
+            for year in range(i + 1):
+                Book.objects.create(title='Book', publication_year=1990 + year, author=author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('author-list'), {
+                'ordering': '-book_count', 'book_count__gte': 2, 'fields': 'id,book_count,latest_publication_year',
+            })
+        self.assertEqual(response.data['results'], [
+            {'id': self.authors[2].pk, 'book_count': 3, 'latest_publication_year': 1992},
+            {'id': self.authors[1].pk, 'book_count': 2, 'latest_publication_year': 1991},
+        ])
+        self.assertNotIn('api_book', queries[0]['sql'])
+
+        response = self.client.get(reverse('author-list'), {'latest_publication_year__lte': 1990})
+        self.assertEqual([author['id'] for author in response.data['results']], [self.authors[0].pk])
+
+    def test_keyset_pages_through_authors_without_books(self):
+        Book.objects.create(title='Book', publication_year=1990, author=self.authors[1])
+        Author.objects.create(name='Author 3')
+        Book.objects.create(title='Book', publication_year=1980, author=Author.objects.get(name='Author 3'))
+        # Authors without books have no latest year; they sort after every year.
+        dated = list(Author.objects.filter(latest_publication_year__isnull=False).order_by('latest_publication_year', 'id'))
+        undated = list(Author.objects.filter(latest_publication_year__isnull=True).order_by('id'))
+        orders = {
+            'latest_publication_year': [author.pk for author in dated + undated],
+            '-latest_publication_year': [author.pk for author in undated[::-1] + dated[::-1]],
+        }
+        for ordering, expected in orders.items():
+            response = self.client.get(reverse('author-list'), {'ordering': ordering, 'page_size': 1})
+            pages = [response]
+            while response.data['next']:
+                response = self.client.get(response.data['next'])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                pages.append(response)
+            self.assertEqual([page.data['results'][0]['id'] for page in pages], expected, ordering)
+
+            backwards = []
+            while response.data['previous']:
+                response = self.client.get(response.data['previous'])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                backwards.append(response.data['results'][0]['id'])
+            self.assertEqual(backwards, expected[-2::-1], ordering)
+
+    def test_rebuild_command_reconciles_drift(self):
+        Book.objects.create(title='Book', publication_year=2000, author=self.authors[0])
+        Author.objects.filter(pk=self.authors[0].pk).update(book_count=7, latest_publication_year=None)
+        self.assertEqual(len(verify_summaries()), 1)
+        call_command('rebuild_book_stats', stdout=io.StringIO())
+        self.assertEqual(self.counters()[self.authors[0].pk], (1, 2000))
+
+
+class OptimisticConcurrencyTestCase(APITestCase):
+    """Versioned, lock-free updates in BookUpdateView"""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user(username='editor'))
+        self.author = Author.objects.create(name='Toni Morrison')
+        self.book = Book.objects.create(title='Beloved', publication_year=1987, author=self.author)
+        self.url = reverse('book-update-detail', kwargs={'pk': self.book.pk})
+
+    def test_patch_by_pk_bumps_version(self):
+        response = self.client.patch(self.url, {'title': 'Beloved (Vintage)', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['version'], 2)
+        self.assertEqual(response['ETag'], '"%d-2"' % self.book.pk)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.title, self.book.publication_year, self.book.version), ('Beloved (Vintage)', 1987, 2))
+
+    def test_form_version_is_coerced(self):
+        response = self.client.patch(self.url, {'title': 'Beloved (Vintage)', 'version': '1'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['version'], 2)
+
+        response = self.client.patch(self.url, {'title': 'Beloved', 'version': 'two'}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.title, self.book.version), ('Beloved (Vintage)', 2))
+
+    def test_stale_version_conflicts(self):
+        self.client.patch(self.url, {'title': 'First editor'}, format='json')
+        response = self.client.patch(self.url, {'title': 'Second editor', 'version': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['version'], 2)
+
+        response = self.client.patch(self.url, {'title': 'Second editor'}, format='json', HTTP_IF_MATCH='"%d-1"' % self.book.pk)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, 'First editor')
+
+    def test_lost_claim_between_read_and_write(self):
+        # Another writer commits after this request read the row but before it writes.
+        original_is_valid = BookSerializer.is_valid
+
+        def concurrent_write(serializer, *args, **kwargs):
+            Book.objects.filter(pk=self.book.pk).update(version=F('version') + 1, title='Concurrent')
+            return original_is_valid(serializer, *args, **kwargs)
+
+        with patch.object(BookSerializer, 'is_valid', concurrent_write), CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'title': 'Mine'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(any('FOR UPDATE' in query['sql'] for query in queries))
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.title, self.book.version), ('Concurrent', 2))
+
+    def test_put_by_body_id_still_works(self):
+        data = {'id': self.book.pk, 'title': 'Sula', 'publication_year': 1973, 'author': self.author.pk}
+        response = self.client.put(reverse('book-update'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['version'], 2)
+
+
+class ProfilingMiddlewareTestCase(APITestCase):
+    """ProfilingMiddleware reports where a request spends its time"""
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name='Ama Ata Aidoo')
+        Book.objects.bulk_create(Book(title='Book %02d' % i, publication_year=1970 + i, author=author) for i in range(5))
+
+    def metrics(self, response):
+        return {metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')}
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-list'))
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'view', 'sql', 'serializer', 'render'})
+        self.assertIn('desc="%d queries"' % len(queries), metrics['sql'])
+
+    def test_async_view(self):
+        # The ORM runs in sync_to_async's thread, on that thread's connections.
+        pk = Book.objects.first().pk
+        for url in [reverse('book-list-async'), reverse('book-detail-async', kwargs={'pk': pk}), reverse('book-detail', kwargs={'pk': pk})]:
+            with CaptureQueriesContext(connection) as queries:
+                response = async_to_sync(self.async_client.get)(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertGreater(len(queries), 0)
+            self.assertIn('desc="%d queries"' % len(queries), self.metrics(response)['sql'], url)
+
+    def test_template_render(self):
+        response = self.client.get(reverse('admin:login'))
+        self.assertIn('render', self.metrics(response))
+
+    @override_settings(PROFILING_LOG_ROUTES={'book-list': 1.0})
+    def test_sampled_log_per_route(self):
+        with self.assertLogs('observability.profiling') as logs:
+            self.client.get(reverse('book-list'))
+            self.client.get(reverse('book-detail', kwargs={'pk': Book.objects.first().pk}))
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['route'], line['status'], line['method']), ('book-list', 200, 'GET'))
+        self.assertGreater(line['sql_queries'], 0)
+
+    @override_settings(PROFILING_SERVER_TIMING=False, PROFILING_LOG_ROUTES={'*': 0})
+    def test_disabled(self):
+        with self.assertNoLogs('observability.profiling'):
+            response = self.client.get(reverse('book-list'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class MetricsTestCase(APITestCase):
+    """MetricsMiddleware and the /metrics exposition"""
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        author = Author.objects.create(name='Buchi Emecheta')
+        self.book = Book.objects.create(title='The Joys of Motherhood', publication_year=1979, author=author)
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_requests_labeled_by_route(self):
+        self.client.get(reverse('book-list'))
+        self.client.get(reverse('book-list'))
+        self.client.get(reverse('book-detail', kwargs={'pk': 999999}))
+        self.client.get('/no/such/page/')
+        lines = self.scrape()
+        self.assertIn('django_http_requests_total{route="book-list",method="GET",status="200"} 2', lines)
+        self.assertIn('django_http_requests_total{route="book-detail",method="GET",status="404"} 1', lines)
+        self.assertIn('django_http_requests_total{route="<unresolved>",method="GET",status="404"} 1', lines)
+        self.assertIn('django_http_request_duration_seconds_bucket{route="book-list",method="GET",status="200",le="+Inf"} 2', lines)
+        self.assertIn('django_http_request_duration_seconds_count{route="book-list",method="GET",status="200"} 2', lines)
+        self.assertIn('# TYPE django_http_request_duration_seconds histogram', lines)
+
+    def test_buckets_are_cumulative(self):
+        registry.observe('django_http_request_duration_seconds', ('r', 'GET', '200'), (0.1, 1.0, float('inf')), 0.05)
+        registry.observe('django_http_request_duration_seconds', ('r', 'GET', '200'), (0.1, 1.0, float('inf')), 0.5)
+        lines = [line for line in self.scrape() if 'route="r"' in line]
+        self.assertEqual([line.rsplit(' ', 1)[1] for line in lines if '_bucket' in line][:3], ['1', '2', '2'])
+        self.assertIn('django_http_request_duration_seconds_sum{route="r",method="GET",status="200"} 0.55', lines)
+
+    def test_processes_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            # Another worker's totals, as written to the shared directory.
+            other = Registry()
+            with patch('observability.metrics.os.getpid', return_value=other.pid):
+                other.inc('django_http_requests_total', ('book-list', 'GET', '200'), 3)
+                other.flush()
+            self.client.get(reverse('book-list'))
+            lines = self.scrape()
+            self.assertIn('django_http_requests_total{route="book-list",method="GET",status="200"} 4', lines)
+            self.assertEqual(len([name for name in os.listdir(directory) if name.startswith('metrics-')]), 2)
+
+    def test_fork_starts_from_zero(self):
+        registry.inc('django_http_requests_total', ('book-list', 'GET', '200'), 5)
+        with patch('observability.metrics.os.getpid', return_value=registry.pid + 1):
+            self.assertEqual(registry.snapshot()['counters'], {})
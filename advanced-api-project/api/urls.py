@@ -1,5 +1,11 @@
 from django.urls import path
-from .views import BookListView, BookDetailView, BookCreateView, BookUpdateView, BookDeleteView
+from .views import (
+    BookListView, BookDetailView, BookExportView, BookCreateView, BookUpdateView, BookDeleteView,
+    AsyncBookListView, AsyncBookDetailView,
+    BookBulkCreateView, BookBulkUpdateView, BookBulkDeleteView,
+    AuthorListView, AuthorDetailView, ResponseCacheStatsView, AutocompleteView,
+    StatsView, BatchView,
+)
 
 urlpatterns = [
     # ListView: Retrieve all books
@@ -8,12 +14,41 @@ urlpatterns = [
     # DetailView: Retrieve a single book by ID
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
 
+    # Native async (ASGI) variants of the list and detail views
+    path('books/async/', AsyncBookListView.as_view(), name='book-list-async'),
+    path('books/async/<int:pk>/', AsyncBookDetailView.as_view(), name='book-detail-async'),
+
+    # Export: Stream the filtered catalog as NDJSON or CSV
+    path('books/export/', BookExportView.as_view(), name='book-export'),
+
     # CreateView: Add a new book
     path('books/create/', BookCreateView.as_view(), name='book-create'),
 
     # UpdateView: Modify an existing book
     path('books/update/', BookUpdateView.as_view(), name='book-update'),
+    path('books/update/<int:pk>/', BookUpdateView.as_view(), name='book-update-detail'),
 
     # DeleteView: Remove a book
     path('books/delete/', BookDeleteView.as_view(), name='book-delete'),
+
+    # Bulk variants: a JSON array per request, written in batches inside one transaction
+    path('books/bulk/create/', BookBulkCreateView.as_view(), name='book-bulk-create'),
+    path('books/bulk/update/', BookBulkUpdateView.as_view(), name='book-bulk-update'),
+    path('books/bulk/delete/', BookBulkDeleteView.as_view(), name='book-bulk-delete'),
+
+    # Authors with their (capped) nested books
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
+
+    # Type-ahead over book titles and author names
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+
+    # Dashboard statistics from incrementally maintained summary tables
+    path('stats/', StatsView.as_view(), name='book-stats'),
+
+    # Batch: several API calls in one request (optionally one transaction)
+    path('batch/', BatchView.as_view(), name='batch'),
+
+    # Monitoring: response cache hit/miss counters
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='cache-stats'),
 ]
\ No newline at end of file
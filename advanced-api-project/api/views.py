@@ -1,34 +1,224 @@
-from rest_framework import generics, filters
+import csv
+import io
+import json
+from urllib.parse import urlencode, urlsplit
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from rest_framework import generics, filters, serializers
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters import rest_framework
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Book, Author
-from .serializers import BookSerializer
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.text import compress_sequence
+from django.utils import timezone
+from django.views import View
+from .models import Book, Author, PublicationYearStat
+from .serializers import BookSerializer, BookBulkSerializer, BookValuesSerializer, AuthorSerializer, AuthorSummarySerializer
+from .pagination import KeysetPagination
+from .fieldsets import SparseFieldsetMixin
+from .includes import IncludeMixin
+from .filters import AuthorFilter, BookFilter
+from .cache import CachedListMixin, bump_generation, get_stats
+from .conditional import ConditionalListMixin, ConditionalRetrieveMixin, book_validators, check_preconditions, set_validators
+from .signals import books_bulk_changed
+from .autocomplete import index as autocomplete_index
+from rest_framework.exceptions import APIException, PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.views import APIView
+
+# BookFilterMixin: Filtering, searching and ordering shared by the book list and export views.
+class BookFilterMixin:
+    queryset = Book.objects.all()
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = BookFilter
+    search_fields = ['title', 'author__name']
+    ordering_fields = ['title', 'publication_year']
 
 # BookListView: Retrieve all books (public access)
-class BookListView(generics.ListAPIView):
+class BookListView(BookFilterMixin, IncludeMixin, SparseFieldsetMixin, CachedListMixin, ConditionalListMixin, generics.ListAPIView):
     """
     Retrieve a list of books with filtering, searching, and ordering capabilities.
-    - Filter by: title, author name, publication year.
+    - Filter by: title, author name, publication year, a year range
+      (`publication_year__gte`/`__lte`) and id sets (`author__in`, `id__in`).
     - Search by: title, author name.
     - Order by: title, publication year.
+    - Paginated with a keyset cursor (`?cursor=`, `?page_size=`); id breaks ties.
+    - Responses are cached per query string until a Book or Author changes.
+    - ETag/Last-Modified come from a MAX(updated_at)/COUNT aggregate; unchanged lists return 304.
+    - With `fast_serialization` (setting BOOK_LIST_FAST_SERIALIZATION) pages are built from
+      `values()` rows by BookValuesSerializer instead of model instances.
+    - `?fields=`/`?exclude=` select the returned fields and the columns read.
+    - `?include=author` embeds each author, loaded for the whole page in one query.
     """
-    queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['title', 'author__name', 'publication_year']
-    search_fields = ['title', 'author__name']
-    ordering_fields = ['title', 'publication_year']
+    pagination_class = KeysetPagination
+    include_relations = {'author': AuthorSummarySerializer}
+    cache_models = (Book, Author)
+
+    @property
+    def fast_serialization(self):
+        # Read per request, so the setting can change without reimporting the view.
+        return getattr(settings, 'BOOK_LIST_FAST_SERIALIZATION', False)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.fast_serialization:
+            return BookValuesSerializer.values(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.fast_serialization:
+            return BookValuesSerializer
+        return super().get_serializer_class()
 
-# BookDetailView: Retrieve a single book by ID (public access)
-class BookDetailView(generics.RetrieveAPIView):
+    def restrict_columns(self, queryset, columns):
+        if self.fast_serialization:
+            return queryset.values(*columns)
+        return super().restrict_columns(queryset, columns)
+
+# BookExportView: Stream the filtered catalog as NDJSON or CSV (public access)
+class BookExportView(BookFilterMixin, generics.GenericAPIView):
+    """
+    Stream every matching book, joined to its author's name, without building the
+    whole list in memory: rows come from `iterator(chunk_size=...)` and are written
+    out one chunk at a time.
+    - Accepts the same filter, search and ordering parameters as BookListView.
+    - `?output=ndjson` (default) or `?output=csv`.
+    - `?compress=gzip` gzips the stream (`Content-Encoding: gzip`).
+    """
+    permission_classes = [AllowAny]
+    chunk_size = 2000
+    columns = ['id', 'title', 'publication_year', 'author', 'author_name']
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.content_types:
+            return Response({"error": "output must be 'ndjson' or 'csv'."}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('compress')
+        if compress not in (None, 'gzip'):
+            return Response({"error": "compress must be 'gzip'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = self.filter_queryset(self.get_queryset()).values_list(
+            'id', 'title', 'publication_year', 'author_id', 'author__name',
+        ).iterator(chunk_size=self.chunk_size)
+        content = self.csv_chunks(rows) if output == 'csv' else self.ndjson_chunks(rows)
+        if compress:
+            content = compress_sequence(content)
+
+        response = StreamingHttpResponse(content, content_type=self.content_types[output])
+        response['Content-Disposition'] = 'attachment; filename="books.%s"' % output
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+    def batched(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def ndjson_chunks(self, rows):
+        for batch in self.batched(rows):
+            lines = (json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n' for row in batch)
+            yield ''.join(lines).encode('utf-8')
+
+    def csv_chunks(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        for batch in self.batched(rows):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+# BookDetailView: Retrieve a single book by ID (public access, 304 when unchanged)
+class BookDetailView(IncludeMixin, SparseFieldsetMixin, ConditionalRetrieveMixin, generics.RetrieveAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [AllowAny]
+    include_relations = {'author': AuthorSummarySerializer}
+    # The ETag and Last-Modified are computed from the version and the row timestamp.
+    sparse_required_fields = ('updated_at', 'version')
+
+# AsyncAllowAny: AllowAny for the async views, checked without leaving the event loop.
+class AsyncAllowAny(AllowAny):
+    async def has_permission(self, request, view):
+        return True
+
+# AsyncBookViewMixin: Permission checks, errors and JSON rendering for the native async book views.
+class AsyncBookViewMixin:
+    """
+    DRF's APIView.dispatch is synchronous, so the async views are plain Django views with
+    `async def` handlers; the request is wrapped in a DRF Request for `query_params`, the
+    filter backends and the permission classes.
+    - Permissions with an async `has_permission` are awaited; others run in `sync_to_async`.
+    - Rows are read with `values()` (BookValuesSerializer), so serialization never triggers
+      a lazy, synchronous query.
+    """
+    permission_classes = [AsyncAllowAny]
+    renderer = JSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            await self.check_permissions(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.render({"detail": exc.detail}, exc.status_code)
+
+    async def check_permissions(self, request):
+        for permission in [permission_class() for permission_class in self.permission_classes]:
+            has_permission = permission.has_permission
+            if not iscoroutinefunction(has_permission):
+                has_permission = sync_to_async(has_permission)
+            if not await has_permission(request, self):
+                raise PermissionDenied(getattr(permission, 'message', None))
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+
+# AsyncBookListView: Book list for ASGI deployments, served without a thread-pool hop (public access)
+class AsyncBookListView(BookFilterMixin, AsyncBookViewMixin, View):
+    """
+    Same filters, ordering and keyset pagination as BookListView, with the page fetched
+    through `aiterator()`. The response cache and conditional GET stay on the sync view.
+    """
+    pagination_class = KeysetPagination
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.queryset.all()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        paginator = self.pagination_class()
+        rows = await paginator.apaginate_queryset(BookValuesSerializer.values(queryset), request, view=self)
+        return self.render(paginator.get_paginated_data(BookValuesSerializer(rows).data))
+
+# AsyncBookDetailView: Retrieve a single book with `aget()` (public access)
+class AsyncBookDetailView(AsyncBookViewMixin, View):
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            book = await BookValuesSerializer.values(Book.objects.all()).aget(pk=pk)
+        except Book.DoesNotExist:
+            return self.render({"detail": "No Book matches the given query."}, status.HTTP_404_NOT_FOUND)
+        return self.render(book)
 
 # BookCreateView: Add a new book (authenticated users only)
 class BookCreateView(generics.CreateAPIView):
@@ -47,21 +237,67 @@ class BookCreateView(generics.CreateAPIView):
 
 # BookUpdateView: Modify an existing book (authenticated users only)
 class BookUpdateView(generics.UpdateAPIView):
+    """
+    PUT /books/update/ with the id in the body, or PUT/PATCH /books/update/<pk>/.
+
+    Optimistic concurrency instead of row locks: the expected version comes from
+    `If-Match` (the detail ETag carries the version), a `version` in the body, or else
+    the version just read. The write first claims it with a conditional
+    `UPDATE ... SET version = version + 1 WHERE id = ? AND version = ?`; if another
+    request got there first nothing matches and the response is 412 (If-Match) or
+    409 (Conflict), so concurrent editors never overwrite each other blindly.
+    """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
 
     def put(self, request, *args, **kwargs):
-        book_id = request.data.get('id')  # Get the book ID from the request data
+        return self.update_book(request, partial=False, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        return self.update_book(request, partial=True, **kwargs)
+
+    def update_book(self, request, partial, pk=None, **kwargs):
+        book_id = pk if pk is not None else request.data.get('id')  # Get the book ID from the URL or request data
         try:
             book = Book.objects.get(id=book_id)
-        except Book.DoesNotExist:
+        except (Book.DoesNotExist, ValueError, TypeError):
             return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = self.get_serializer(book, data=request.data, partial=False)
+        # Honor If-Match / If-Unmodified-Since: refuse to overwrite a book that changed since the client read it.
+        etag, last_modified = book_validators(book)
+        precondition_failed = check_preconditions(request, etag, last_modified)
+        if precondition_failed is not None:
+            return set_validators(precondition_failed, etag, last_modified)
+        # Form and multipart bodies carry the version as a string.
+        expected = request.data.get('version', book.version)
+        try:
+            if isinstance(expected, bool):
+                raise TypeError
+            expected = int(expected)
+        except (TypeError, ValueError):
+            return Response({"error": "version must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if expected != book.version:
+            return self.conflict(book.version)
+
+        serializer = self.get_serializer(book, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response({"message": "Book updated successfully!", "data": serializer.data}, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            claimed = Book.objects.filter(id=book.id, version=book.version).update(version=F('version') + 1)
+            if not claimed:
+                current = Book.objects.filter(id=book.id).values_list('version', flat=True).first()
+                if current is None:
+                    return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
+                if 'HTTP_IF_MATCH' in request.META:
+                    return Response({"error": "Book was modified by another request.", "version": current}, status=status.HTTP_412_PRECONDITION_FAILED)
+                return self.conflict(current)
+            # Book.save() moves the in-memory version to the one just claimed.
+            serializer.save()
+        response = Response({"message": "Book updated successfully!", "data": serializer.data}, status=status.HTTP_200_OK)
+        return set_validators(response, *book_validators(book))
+
+    def conflict(self, current):
+        return Response({"error": "Book was modified by another request.", "version": current}, status=status.HTTP_409_CONFLICT)
 
 # BookDeleteView: Remove a book (authenticated users only)
 class BookDeleteView(generics.DestroyAPIView):
@@ -78,3 +314,389 @@ class BookDeleteView(generics.DestroyAPIView):
 
         book.delete()
         return Response({"message": "Book deleted successfully!"}, status=status.HTTP_204_NO_CONTENT)
+
+# BookBulkMixin: Shared parsing and validation for the bulk endpoints (authenticated users only)
+class BookBulkMixin:
+    """
+    Bulk endpoints take a JSON array and are all-or-nothing: every item is validated
+    first (authors with one `in_bulk` query), then rows are written in batches of
+    `?batch_size=` inside a single transaction. The response lists a result per item.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookBulkSerializer
+    permission_classes = [IsAuthenticated]
+    batch_size = 500
+    max_batch_size = 5000
+    max_items = 10000
+
+    def get_batch_size(self):
+        try:
+            batch_size = int(self.request.query_params['batch_size'])
+        except (KeyError, ValueError):
+            return self.batch_size
+        return max(1, min(batch_size, self.max_batch_size))
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, Response({"error": "Expected a non-empty JSON array."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_items:
+            return None, Response({"error": "At most %d items per request." % self.max_items}, status=status.HTTP_400_BAD_REQUEST)
+        return items, None
+
+    def validate_items(self, items, partial=False):
+        """
+        Return (validated_data list, errors list); errors[i] is empty for valid items.
+        """
+        # One serializer instance validates every item, as ListSerializer does, but keeps per-item results.
+        serializer = self.get_serializer(partial=partial)
+        validated, errors = [], []
+        for item in items:
+            try:
+                validated.append(serializer.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                validated.append(None)
+                errors.append(exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail})
+
+        author_ids = {data['author'] for data in validated if data and 'author' in data}
+        authors = Author.objects.in_bulk(author_ids)
+        for data, error in zip(validated, errors):
+            if data and 'author' in data and data['author'] not in authors:
+                error['author'] = ['Invalid pk "%s" - object does not exist.' % data['author']]
+        return validated, errors
+
+    def error_response(self, errors):
+        results = [
+            {"index": index, "status": "invalid", "errors": error} if error else {"index": index, "status": "valid"}
+            for index, error in enumerate(errors)
+        ]
+        return Response({"error": "No books were written.", "results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+# BookBulkCreateView: Add many books in one request (authenticated users only)
+class BookBulkCreateView(BookBulkMixin, generics.GenericAPIView):
+    def post(self, request, *args, **kwargs):
+        items, error = self.get_items(request)
+        if error:
+            return error
+        validated, errors = self.validate_items(items)
+        if any(errors):
+            return self.error_response(errors)
+
+        books = [
+            Book(title=data['title'], publication_year=data['publication_year'], author_id=data['author'])
+            for data in validated
+        ]
+        with transaction.atomic():
+            Book.objects.bulk_create(books, batch_size=self.get_batch_size())
+            books_bulk_changed.send(sender=Book, created=books, updated=[])
+
+        results = [
+            {"index": index, "status": "created", "data": BookSerializer(book).data}
+            for index, book in enumerate(books)
+        ]
+        return Response({"message": "%d books created successfully!" % len(books), "results": results}, status=status.HTTP_201_CREATED)
+
+# BookBulkUpdateView: Modify many books in one request (authenticated users only)
+class BookBulkUpdateView(BookBulkMixin, generics.GenericAPIView):
+    def put(self, request, *args, **kwargs):
+        return self.bulk_update(request, partial=False)
+
+    def patch(self, request, *args, **kwargs):
+        return self.bulk_update(request, partial=True)
+
+    def bulk_update(self, request, partial):
+        items, error = self.get_items(request)
+        if error:
+            return error
+        validated, errors = self.validate_items(items, partial=partial)
+
+        ids = [data.get('id') if data else None for data in validated]
+        books = Book.objects.in_bulk([book_id for book_id in ids if book_id is not None])
+        seen = set()
+        for book_id, error in zip(ids, errors):
+            if error:
+                continue
+            if book_id is None:
+                error['id'] = ['This field is required.']
+            elif book_id not in books:
+                error['id'] = ['Book not found.']
+            elif book_id in seen:
+                error['id'] = ['Duplicate id in request.']
+            seen.add(book_id)
+        if any(errors):
+            return self.error_response(errors)
+
+        # bulk_update() bypasses auto_now and Book.save(), so stamp updated_at and the version explicitly.
+        now = timezone.now()
+        fields = {'updated_at', 'version'}
+        for data in validated:
+            book = books[data['id']]
+            book.updated_at = now
+            book.version += 1
+            for field in ('title', 'publication_year'):
+                if field in data:
+                    setattr(book, field, data[field])
+                    fields.add(field)
+            if 'author' in data:
+                book.author_id = data['author']
+                fields.add('author')
+        updated = [books[data['id']] for data in validated]
+        with transaction.atomic():
+            Book.objects.bulk_update(updated, sorted(fields), batch_size=self.get_batch_size())
+            books_bulk_changed.send(sender=Book, created=[], updated=updated)
+
+        results = [
+            {"index": index, "status": "updated", "data": BookSerializer(book).data}
+            for index, book in enumerate(updated)
+        ]
+        return Response({"message": "%d books updated successfully!" % len(updated), "results": results}, status=status.HTTP_200_OK)
+
+# BookBulkDeleteView: Remove many books by id in one request (authenticated users only)
+class BookBulkDeleteView(BookBulkMixin, generics.GenericAPIView):
+    def delete(self, request, *args, **kwargs):
+        ids, error = self.get_items(request)
+        if error:
+            return error
+        if not all(isinstance(book_id, int) and not isinstance(book_id, bool) for book_id in ids):
+            return Response({"error": "Expected a JSON array of book ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        batch_size = self.get_batch_size()
+        existing = set()
+        with transaction.atomic():
+            for start in range(0, len(ids), batch_size):
+                batch = Book.objects.filter(id__in=ids[start:start + batch_size])
+                existing.update(batch.values_list('id', flat=True))
+                batch.delete()
+
+        results = [
+            {"index": index, "id": book_id, "status": "deleted" if book_id in existing else "not_found"}
+            for index, book_id in enumerate(ids)
+        ]
+        return Response({"message": "%d books deleted successfully!" % len(existing), "results": results}, status=status.HTTP_200_OK)
+
+# BatchView: Run several API calls in one HTTP request (sub-requests keep their own permissions)
+class BatchView(APIView):
+    """
+    POST a JSON list of sub-requests, or `{"atomic": true, "requests": [...]}`:
+        {"method": "GET", "path": "/api/books/1/", "query": {...}, "body": {...}, "headers": {...}}
+    Each one is dispatched to the view routed for its path in `api/urls.py`, in this
+    request, on this database connection, as the user who sent the batch (authenticated
+    once). The response holds one `{"status", "headers", "body"}` per sub-request, in order.
+
+    With `atomic`, all sub-requests run in one transaction: the first failure (status >= 400)
+    rolls everything back, the remaining sub-requests are skipped (424) and the batch answers 400.
+    """
+    permission_classes = [AllowAny]
+    max_requests = 50
+    methods = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+    forwarded_headers = ('ETag', 'Last-Modified', 'Location', 'X-Cache')
+
+    def post(self, request, *args, **kwargs):
+        payload = request.data
+        atomic = False
+        if isinstance(payload, dict):
+            atomic = payload.get('atomic', False)
+            if not isinstance(atomic, bool):
+                return Response({"error": "atomic must be true or false."}, status=status.HTTP_400_BAD_REQUEST)
+            payload = payload.get('requests')
+        if not isinstance(payload, list) or not payload:
+            return Response({"error": "Expected a non-empty list of requests."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(payload) > self.max_requests:
+            return Response({"error": "At most %d requests per batch." % self.max_requests}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not atomic:
+            return Response({"results": [self.dispatch_item(request, item) for item in payload]})
+
+        results = []
+        with transaction.atomic():
+            for item in payload:
+                result = self.dispatch_item(request, item)
+                results.append(result)
+                if result['status'] >= 400:
+                    transaction.set_rollback(True)
+                    break
+        if len(results) == len(payload) and results[-1]['status'] < 400:
+            return Response({"results": results})
+
+        # Responses cached during the rolled-back transaction describe rows that no longer exist.
+        bump_generation(Book)
+        bump_generation(Author)
+        skipped = {"status": status.HTTP_424_FAILED_DEPENDENCY, "headers": {}, "body": {"error": "Skipped after an earlier failure."}}
+        results += [skipped] * (len(payload) - len(results))
+        return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+    def dispatch_item(self, request, item):
+        from . import urls as api_urls
+
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return self.error_result("Each request needs a path.")
+        method = str(item.get('method', 'GET')).upper()
+        if method not in self.methods:
+            return self.error_result("Unsupported method %s." % method)
+        for name, types, expected in [('query', dict, 'an object'), ('headers', dict, 'an object'), ('body', (dict, list), 'an object or a list')]:
+            if item.get(name) is not None and not isinstance(item[name], types):
+                return self.error_result("%s must be %s." % (name, expected))
+        url = urlsplit(item['path'])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return self.error_result("No API route matches %s." % url.path, status.HTTP_404_NOT_FOUND)
+        if match.func not in [pattern.callback for pattern in api_urls.urlpatterns] or match.func.view_class is BatchView:
+            return self.error_result("%s cannot be called from a batch." % url.path, status.HTTP_404_NOT_FOUND)
+
+        sub_request = self.build_request(request, method, url, item)
+        if iscoroutinefunction(match.func):
+            response = async_to_sync(match.func)(sub_request, *match.args, **match.kwargs)
+        else:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            return self.error_result("%s streams its response; call it directly." % url.path)
+        if hasattr(response, 'render'):
+            response.render()
+        if hasattr(response, 'data'):
+            body = response.data
+        elif response.content and response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset) or None
+        headers = {header: response[header] for header in self.forwarded_headers if response.has_header(header)}
+        return {"status": response.status_code, "headers": headers, "body": body}
+
+    def build_request(self, request, method, url, item):
+        """
+        A WSGI request for one sub-request: the batch's server/client environment, the
+        sub-request's own method, query, JSON body and headers, and the batch's user.
+        """
+        body = json.dumps(item['body']).encode('utf-8') if item.get('body') is not None else b''
+        query = url.query
+        if item.get('query'):
+            query = '&'.join(filter(None, [query, urlencode(item['query'], doseq=True)]))
+        environ = {
+            key: value for key, value in request.META.items()
+            if not key.startswith('HTTP_IF_') and key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING')
+        }
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+        for name, value in (item.get('headers') or {}).items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+        sub_request = WSGIRequest(environ)
+        # DRF's forced authentication: the batch was authenticated once, sub-requests reuse it.
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        return sub_request
+
+    def error_result(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        return {"status": status_code, "headers": {}, "body": {"error": message}}
+
+# ResponseCacheStatsView: Hit/miss counters of the list response cache (admin users only)
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_stats())
+
+# AutocompleteView: Ranked type-ahead over book titles and author names (public access)
+class AutocompleteView(APIView):
+    """
+    Prefix lookups (`?q=`) against an in-process index instead of LIKE scans.
+    - Limit results with `?limit=` (default 10, max 50).
+    - Restrict to `?type=book` or `?type=author`.
+    """
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        kind = request.query_params.get('type')
+        if kind not in (None, 'book', 'author'):
+            return Response({"error": "type must be 'book' or 'author'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = autocomplete_index.search(request.query_params.get('q', ''), limit=limit, kinds=kind and {kind})
+        return Response({"results": [{"type": kind, "id": pk, "label": label} for kind, pk, label in matches]})
+
+# StatsView: Book counts per publication year and per author, read from the maintained counters (public access)
+class StatsView(APIView):
+    """
+    Dashboard statistics maintained incrementally by `api.signals`, so a request reads the
+    small year summary table and the `Author.book_count` index instead of running GROUP BY
+    over every book.
+    - Limit the author ranking with `?authors_limit=` (default 100, max 1000).
+    """
+    permission_classes = [AllowAny]
+    default_authors_limit = 100
+    max_authors_limit = 1000
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get('authors_limit', self.default_authors_limit))
+        except ValueError:
+            return Response({"error": "authors_limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_authors_limit))
+
+        years = PublicationYearStat.objects.filter(book_count__gt=0).order_by('publication_year')
+        authors = Author.objects.filter(book_count__gt=0).order_by('-book_count', '-id').values('id', 'name', 'book_count')[:limit]
+        return Response({
+            "books_per_year": [{"publication_year": stat.publication_year, "count": stat.book_count} for stat in years],
+            "books_per_author": [
+                {"author": row['id'], "name": row['name'], "count": row['book_count']} for row in authors
+            ],
+        })
+
+# AuthorQuerysetMixin: Load authors with their newest books in two queries, whatever the page size.
+class AuthorQuerysetMixin(IncludeMixin, SparseFieldsetMixin):
+    """
+    Nested books are loaded with a single sliced `Prefetch` (one windowed query for the
+    whole page) and only the columns BookSerializer needs. `?books_limit=` caps the
+    number of nested books per author; `book_count` (a maintained column) reports the full total.
+    With `?fields=`/`?exclude=`, the prefetch is skipped when `books` is not selected.
+    """
+    serializer_class = AuthorSerializer
+    permission_classes = [AllowAny]
+    # Books are always embedded (see get_queryset); `?include=books` is accepted for symmetry.
+    include_relations = {'books': None}
+    books_limit = 10
+    max_books_limit = 50
+
+    def get_books_limit(self):
+        try:
+            limit = int(self.request.query_params['books_limit'])
+        except (KeyError, ValueError):
+            return self.books_limit
+        return max(0, min(limit, self.max_books_limit))
+
+    def get_queryset(self):
+        fields = self.get_sparse_fields()
+        queryset = Author.objects.all()
+        if fields is None or 'books' in fields:
+            books = Book.objects.only('id', 'title', 'publication_year', 'author_id', 'version').order_by('-publication_year', '-id')
+            queryset = queryset.prefetch_related(
+                Prefetch('books', queryset=books[:self.get_books_limit()], to_attr='recent_books')
+            )
+        return queryset
+
+# AuthorListView: Retrieve authors with their books (public access)
+class AuthorListView(AuthorQuerysetMixin, generics.ListAPIView):
+    """
+    - Order by: name, book_count, latest_publication_year (each backed by an (x, id) index).
+    - Filter by: book_count__gte/__lte, latest_publication_year__gte/__lte.
+    """
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = AuthorFilter
+    ordering_fields = ['name', 'book_count', 'latest_publication_year']
+
+# AuthorDetailView: Retrieve a single author with their books (public access)
+class AuthorDetailView(AuthorQuerysetMixin, generics.RetrieveAPIView):
+    pass
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'bookshelf.CustomUser'
 
 MIDDLEWARE = [
+    'observability.metrics.MetricsMiddleware',
      'csp.middleware.CSPMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -61,8 +63,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'observability.profiling.ProfilingMiddleware',
 ]
 
+# ProfilingMiddleware: Server-Timing header on every response, and a JSON log line
+# ("observability.profiling" logger) for a sample of the requests to these URL names.
+PROFILING_SERVER_TIMING = True
+PROFILING_LOG_ROUTES = {
+    # '*': 0.01,
+}
+
+# MetricsMiddleware / GET /metrics. Under gunicorn, point METRICS_DIR at a directory shared by
+# the workers (emptied on deploy); each worker writes its totals there every METRICS_FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
 CSP_DEFAULT_SRC = ("'self'",)  
 CSP_SCRIPT_SRC = ("'self'",)  
 CSP_STYLE_SRC = ("'self'",) 
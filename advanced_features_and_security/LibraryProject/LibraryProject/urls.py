@@ -18,7 +18,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from observability.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('bookshelf/', include('bookshelf.urls')), 
+    path('metrics', metrics_view, name='metrics'),  # Prometheus text exposition
 ]
\ No newline at end of file
@@ -0,0 +1,158 @@
+# Token authentication without a database query per request: authenticated tokens are kept in a small
+# in-process LRU and in the Django cache, and dropped when the token is deleted or its user changes.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+CACHE_KEY = 'api:auth-token:%s'
+# Left in the shared cache by invalidate() in place of the token.
+INVALIDATED = 'invalidated'
+
+
+def _setting(name, default):
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, default)
+
+
+def cache_key(key):
+    # Keys are hashed so raw tokens never end up in the cache backend.
+    return CACHE_KEY % hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class TokenLRU:
+    """
+    Thread-safe in-process LRU of token key -> (Token with its user, expiry time).
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, token, timeout):
+        with self.lock:
+            self.entries[key] = (token, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_tokens = TokenLRU(_setting('MAX_ENTRIES', 1024))
+
+# Per-process counters; a lookup is a local hit, a shared (Django cache) hit or a miss.
+_stats = {'local_hit': 0, 'shared_hit': 0, 'miss': 0}
+_stats_lock = threading.Lock()
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    hits = stats['local_hit'] + stats['shared_hit']
+    stats['hit_rate'] = hits / total if total else 0.0
+    stats['local_entries'] = len(local_tokens.entries)
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def dump_token(token):
+    """
+    What the shared cache keeps of an authenticated token: its own fields and the user's,
+    without the password hash, so no credential material ends up in the cache backend.
+    """
+    user = token.user
+    fields = [field.attname for field in user._meta.concrete_fields if field.name != 'password']
+    return {
+        'token': [getattr(token, field.attname) for field in Token._meta.concrete_fields],
+        'user': (fields, [getattr(user, name) for name in fields]),
+    }
+
+
+def load_token(data):
+    # from_db leaves the password deferred: it is loaded on access, and save() does not write it.
+    fields, values = data['user']
+    User = Token._meta.get_field('user').related_model
+    user = User.from_db(router.db_for_read(User), fields, values)
+    token = Token.from_db(router.db_for_read(Token), [field.attname for field in Token._meta.concrete_fields], data['token'])
+    token.user = user
+    return token
+
+
+def invalidate(*keys):
+    """
+    Forget the given token keys in this process and mark them invalidated in the shared cache,
+    now and again when the surrounding transaction commits (a lookup may read the old rows until then).
+    Other processes drop their local copy when its (short) LOCAL_TIMEOUT runs out.
+    """
+    for key in keys:
+        local_tokens.delete(key)
+    _mark_invalidated(keys)
+    transaction.on_commit(lambda: _mark_invalidated(keys))
+
+
+def _mark_invalidated(keys):
+    cache.set_many({cache_key(key): INVALIDATED for key in keys}, _setting('INVALIDATION_TIMEOUT', 5))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches the token/user lookup.
+
+    The in-process LRU answers most requests without any I/O; on a local miss the
+    Django cache is tried before the `authtoken_token` + `auth_user` query. Only
+    valid tokens of active users are cached, so failures always hit the database.
+    """
+    def authenticate_credentials(self, key):
+        token = local_tokens.get(key)
+        if token is not None:
+            record('local_hit')
+            return (token.user, token)
+
+        cached = cache.get(cache_key(key))
+        # Anything else is the invalidation marker (or an entry from an older release).
+        if isinstance(cached, dict):
+            record('shared_hit')
+            token = load_token(cached)
+        else:
+            record('miss')
+            user, token = super().authenticate_credentials(key)
+            # `add` never overwrites an invalidation that happened after the query above;
+            # the token is then answered from the database until the marker expires.
+            if not cache.add(cache_key(key), dump_token(token), _setting('TIMEOUT', 60)) and cache.get(cache_key(key)) == INVALIDATED:
+                return (user, token)
+        local_tokens.set(key, token, _setting('LOCAL_TIMEOUT', 5))
+        return (token.user, token)
@@ -0,0 +1,85 @@
+# Change feed over the BookChange log: read the deltas after a cursor, and compact old entries.
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from .models import Book, BookChange, BookChangeCompaction
+
+
+def settled_before():
+    """
+    Entries written after this may still be invisible behind a lower, uncommitted id: ids are
+    handed out at insert, not at commit, so concurrent writers commit out of order. The feed only
+    moves past entries older than BOOK_CHANGE_FEED_GRACE seconds, which assumes every transaction
+    writing books commits within that window (with serialized writers it could be 0).
+    """
+    return timezone.now() - datetime.timedelta(seconds=getattr(settings, 'BOOK_CHANGE_FEED_GRACE', 5))
+
+
+def latest_cursor():
+    # The newest entries may have been tombstones that compaction dropped.
+    settled = BookChange.objects.filter(changed_at__lt=settled_before())
+    return max(settled.aggregate(cursor=Max('id'))['cursor'] or 0, horizon())
+
+
+def horizon():
+    """
+    Cursors below this may have missed deletes that compaction dropped.
+    """
+    return BookChangeCompaction.objects.aggregate(horizon=Max('through_id'))['horizon'] or 0
+
+
+def changes_since(since, limit):
+    """
+    Return (changes, next cursor, has_more) for up to `limit` log entries after `since`.
+    Several entries for one book collapse into its current state: (action, book_id, Book or None).
+    """
+    entries = list(BookChange.objects.filter(id__gt=since).order_by('id').values_list('id', 'book_id', 'action', 'changed_at')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    # Stop at the first entry that is too recent; the client asks again later.
+    cutoff = settled_before()
+    for i, entry in enumerate(entries):
+        if entry[3] >= cutoff:
+            entries, has_more = entries[:i], False
+            break
+    if not entries:
+        return [], since, False
+
+    latest = {}
+    for entry_id, book_id, action, changed_at in entries:
+        latest.pop(book_id, None)
+        latest[book_id] = action
+    books = Book.objects.in_bulk([book_id for book_id, action in latest.items() if action != BookChange.DELETE])
+    changes = []
+    for book_id, action in latest.items():
+        book = books.get(book_id)
+        # A book deleted after this page was written reads as deleted now; its tombstone follows later.
+        if book is None:
+            action = BookChange.DELETE
+        changes.append((action, book_id, book))
+    return changes, entries[-1][0], has_more
+
+
+def compact(before, drop_deletes=False):
+    """
+    Compact the entries written before `before`: remove entries superseded by a later
+    entry for the same book (no cursor loses anything) and, with `drop_deletes`, the
+    remaining old tombstones, moving the horizon past them. Returns the counts removed.
+    """
+    with transaction.atomic():
+        old = BookChange.objects.filter(changed_at__lt=before)
+        newer = BookChange.objects.filter(book_id=OuterRef('book_id'), id__gt=OuterRef('id'))
+        superseded, _ = old.filter(Exists(newer)).delete()
+
+        tombstones = 0
+        if drop_deletes:
+            old_tombstones = old.filter(action=BookChange.DELETE)
+            through_id = old_tombstones.aggregate(through_id=Max('id'))['through_id']
+            if through_id is not None:
+                tombstones, _ = old_tombstones.filter(id__lte=through_id).delete()
+                BookChangeCompaction.objects.create(through_id=through_id, removed=tombstones)
+    return superseded, tombstones
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Book
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from api.serializers import BookSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare response size and encode time of the JSON, orjson and MessagePack renderers for a book list.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Unsaved instances: the encoders are measured, not the database.
+        books = [
+            Book(id=i, title='Book title number %d' % i, author='Author %d' % (i % 500))
+            for i in range(1, options['rows'] + 1)
+        ]
+        data = BookSerializer(books, many=True).data
+
+        renderers = [('JSONRenderer', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('ORJSONRenderer', ORJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+
+        self.stdout.write('%-20s %12s %12s %10s' % ('renderer', 'bytes', 'encode ms', 'speedup'))
+        baseline = None
+        for name, renderer in renderers:
+            size = len(renderer.render(data))
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                renderer.render(data)
+            elapsed = (time.perf_counter() - start) * 1000 / options['repeat']
+            baseline = baseline or elapsed
+            self.stdout.write('%-20s %12d %12.2f %9.1fx' % (name, size, elapsed, baseline / elapsed))
+        missing = [name for name, module in [('orjson', orjson), ('msgpack', msgpack)] if module is None]
+        if missing:
+            self.stdout.write('Not installed: %s' % ', '.join(missing))
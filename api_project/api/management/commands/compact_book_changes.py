@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.changes import compact, horizon
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact the book change log: drop entries older than --days that a later entry for the '
+        'same book supersedes and, with --drop-deletes, old tombstones (older cursors then get 410).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Only compact entries older than this.')
+        parser.add_argument('--drop-deletes', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must be >= 0')
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        superseded, tombstones = compact(before, drop_deletes=options['drop_deletes'])
+        self.stdout.write('Removed %d superseded entries and %d tombstones; cursors below %d must resync.' % (
+            superseded, tombstones, horizon(),
+        ))
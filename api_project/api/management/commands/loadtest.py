@@ -0,0 +1,266 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test a running api_project (runserver or gunicorn): obtain a token, then drive books/ and '
+        'books_all/ with a read/write mix from concurrent keep-alive connections; prints a JSON report.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server.')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument(
+            '--create-user', action='store_true',
+            help='Create the user (and its password) in this settings\' database first, if missing.',
+        )
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds.')
+        parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of requests that write (0-1).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Also write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        target = urlsplit(options['url'])
+        if target.scheme != 'http' or not target.hostname:
+            raise CommandError('--url must be an http:// URL')
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be >= 1')
+        if options['create_user']:
+            user, created = get_user_model().objects.get_or_create(username=options['username'])
+            if created or not user.check_password(options['password']):
+                user.set_password(options['password'])
+                user.save()
+
+        client = LoadTest(
+            target.hostname, target.port or 80, target.path.rstrip('/'), options['concurrency'],
+            options['duration'], options['write_ratio'], options['seed'],
+        )
+        try:
+            report = asyncio.run(client.run(options['username'], options['password']))
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            raise CommandError('Cannot load test %s: %s' % (options['url'], exc))
+        report['target'] = options['url']
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+
+class Connection:
+    """
+    One HTTP/1.1 keep-alive connection that reconnects when the server closes it
+    (gunicorn sync workers answer with Connection: close).
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        """
+        Send one request and return (status, parsed JSON body or None).
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        headers = [
+            '%s %s HTTP/1.1' % (method, path),
+            'Host: %s:%d' % (self.host, self.port),
+            'Accept: application/json',
+            'Connection: keep-alive',
+            'Content-Length: %d' % len(payload),
+        ]
+        if body is not None:
+            headers.append('Content-Type: application/json')
+        if token:
+            headers.append('Authorization: Token %s' % token)
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + payload)
+        await self.writer.drain()
+        try:
+            status, response_headers, content = await read_response(self.reader)
+        except (OSError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        data = None
+        if content and response_headers.get('content-type', '').startswith('application/json'):
+            data = json.loads(content)
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response (Content-Length, chunked, or until close) and return (status, headers, body).
+    """
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    status_line, *header_lines = head.rstrip('\r\n').split('\r\n')
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    status = int(status_line.split()[1])
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                break
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif status in (204, 304) or 100 <= status < 200:
+        body = b''
+    else:
+        body = await reader.read()
+        headers['connection'] = 'close'
+    return status, headers, body
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+class LoadTest:
+    # Operations and the status that counts as a success.
+    EXPECTED = {
+        'list books/': 200, 'list books_all/': 200, 'retrieve books_all/<pk>/': 200,
+        'create books_all/': 201, 'update books_all/<pk>/': 200, 'delete books_all/<pk>/': 204,
+    }
+
+    def __init__(self, host, port, prefix, concurrency, duration, write_ratio, seed):
+        self.host = host
+        self.port = port
+        self.api = prefix + '/api/'
+        self.concurrency = concurrency
+        self.duration = duration
+        self.write_ratio = write_ratio
+        self.rng = random.Random(seed)
+        self.results = {operation: {'latencies': [], 'requests': 0, 'errors': 0} for operation in self.EXPECTED}
+        self.book_ids = []
+
+    async def run(self, username, password):
+        setup = Connection(self.host, self.port)
+        status, data = await setup.request('POST', self.api + 'api-token-auth/', {'username': username, 'password': password})
+        if status != 200 or not data or 'token' not in data:
+            raise ValueError('api-token-auth/ returned %d; check --username/--password (or pass --create-user)' % status)
+        self.token = data['token']
+        status, data = await setup.request('GET', self.api + 'books_all/', token=self.token)
+        if status != 200:
+            raise ValueError('books_all/ returned %d' % status)
+        self.book_ids = [book['id'] for book in data]
+        setup.close()
+
+        start = time.perf_counter()
+        self.deadline = start + self.duration
+        await asyncio.gather(*[self.worker(i) for i in range(self.concurrency)])
+        return self.report(time.perf_counter() - start)
+
+    def next_operation(self, owned):
+        if self.rng.random() < self.write_ratio:
+            # Writes only touch books this worker created, and delete about as many as they add.
+            if not owned:
+                return 'create books_all/'
+            return self.rng.choice(['create books_all/', 'update books_all/<pk>/', 'delete books_all/<pk>/'])
+        if self.book_ids or owned:
+            return self.rng.choice(['list books/', 'list books_all/', 'retrieve books_all/<pk>/'])
+        return self.rng.choice(['list books/', 'list books_all/'])
+
+    async def worker(self, number):
+        connection = Connection(self.host, self.port)
+        owned = []
+        while time.perf_counter() < self.deadline:
+            operation = self.next_operation(owned)
+            method, path, body = self.build(operation, number, owned)
+            self.results[operation]['requests'] += 1
+            sent = time.perf_counter()
+            try:
+                status, data = await connection.request(method, path, body, token=self.token)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                self.results[operation]['errors'] += 1
+                connection.close()
+                continue
+            self.results[operation]['latencies'].append((time.perf_counter() - sent) * 1000)
+            if status != self.EXPECTED[operation]:
+                self.results[operation]['errors'] += 1
+            elif operation == 'create books_all/':
+                owned.append(data['id'])
+            elif operation == 'delete books_all/<pk>/':
+                owned.remove(int(path.rstrip('/').rsplit('/', 1)[1]))
+        # Leave the database as it was found.
+        for pk in owned:
+            try:
+                await connection.request('DELETE', '%sbooks_all/%d/' % (self.api, pk), token=self.token)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                break
+        connection.close()
+
+    def build(self, operation, number, owned):
+        if operation == 'list books/':
+            return 'GET', self.api + 'books/', None
+        if operation == 'list books_all/':
+            return 'GET', self.api + 'books_all/', None
+        if operation == 'retrieve books_all/<pk>/':
+            return 'GET', '%sbooks_all/%d/' % (self.api, self.rng.choice(self.book_ids or owned)), None
+        if operation == 'create books_all/':
+            return 'POST', self.api + 'books_all/', {'title': 'Load test %d' % number, 'author': 'loadtest'}
+        pk = self.rng.choice(owned)
+        if operation == 'update books_all/<pk>/':
+            return 'PATCH', '%sbooks_all/%d/' % (self.api, pk), {'title': 'Load test %d (updated)' % number}
+        return 'DELETE', '%sbooks_all/%d/' % (self.api, pk), None
+
+    def report(self, elapsed):
+        def summary(latencies, requests, errors):
+            data = {
+                'requests': requests,
+                'errors': errors,
+                'error_rate': round(errors / requests, 4) if requests else 0.0,
+                'throughput_rps': round(len(latencies) / elapsed, 1),
+            }
+            if latencies:
+                data['latency_ms'] = {
+                    'p50': round(percentile(latencies, 50), 2),
+                    'p95': round(percentile(latencies, 95), 2),
+                    'p99': round(percentile(latencies, 99), 2),
+                }
+            return data
+
+        operations = {
+            operation: summary(result['latencies'], result['requests'], result['errors'])
+            for operation, result in self.results.items() if result['requests']
+        }
+        report = summary(
+            [latency for result in self.results.values() for latency in result['latencies']],
+            sum(result['requests'] for result in self.results.values()),
+            sum(result['errors'] for result in self.results.values()),
+        )
+        report.update({
+            'duration_s': round(elapsed, 2),
+            'concurrency': self.concurrency,
+            'write_ratio': self.write_ratio,
+            'operations': operations,
+        })
+        return report
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+def log_existing_books(apps, schema_editor):
+    # A feed read from the start (since=0) must return the books that predate the log.
+    Book = apps.get_model('api', 'Book')
+    BookChange = apps.get_model('api', 'BookChange')
+    BookChange.objects.bulk_create(
+        (BookChange(book_id=pk, action='create') for pk in Book.objects.order_by('id').values_list('id', flat=True).iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookChangeCompaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('through_id', models.BigIntegerField()),
+                ('removed', models.PositiveIntegerField()),
+                ('compacted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('book_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['book_id', 'id'], name='bookchange_book_id_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_books, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 # Create your models here.
 class Book(models.Model):
@@ -6,4 +6,40 @@ class Book(models.Model):
     author = models.CharField(max_length=100)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+    def save(self, *args, **kwargs):
+        # The post_save receiver appends to BookChange; both writes commit or roll back together.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class BookChange(models.Model):
+    """
+    Append-only log of Book writes; the id is the change feed cursor.
+    Deleted books are not a foreign key, so their tombstones outlive them.
+    """
+    CREATE, UPDATE, DELETE = 'create', 'update', 'delete'
+    ACTIONS = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    book_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['book_id', 'id'], name='bookchange_book_id_idx')]
+
+    def __str__(self):
+        return '%s %s' % (self.action, self.book_id)
+
+
+class BookChangeCompaction(models.Model):
+    """
+    One row per compaction that dropped tombstones: cursors below `through_id` may have missed deletes.
+    """
+    through_id = models.BigIntegerField()
+    removed = models.PositiveIntegerField()
+    compacted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return 'through %s' % self.through_id
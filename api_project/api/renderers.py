@@ -0,0 +1,121 @@
+# Faster encoders for large responses: orjson for application/json and MessagePack for
+# application/msgpack. Both are optional; settings only enable the ones that are installed.
+import math
+import re
+
+from django.utils.http import parse_header_parameters
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Same fallback as the default renderer for the types neither library knows (lazy strings, Decimal, ...).
+_default = encoders.JSONEncoder().default
+
+# orjson output that may hold a float the stock encoder writes differently: NaN/Infinity come out
+# as null, exponents as 1e16/1e-7 rather than 1e+16/1e-07 (always e1..e3 or e-), and values in
+# [1e-7, 1e-4) without an exponent (0.000015 rather than 1.5e-05, always 0.0000...).
+_EXPONENT = re.compile(rb'e[-123]')
+_SCALARS = frozenset([str, int, bool, type(None)])
+
+
+def _unsafe_float(value):
+    return not math.isfinite(value) or (value and not 1e-4 <= abs(value) < 1e16)
+
+
+def _has_unsafe_float(data):
+    if type(data) is float:
+        return _unsafe_float(data)
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if not isinstance(value, (dict, list, tuple)):
+            continue
+        for item in (value.values() if isinstance(value, dict) else value):
+            kind = type(item)
+            if kind in _SCALARS:
+                continue
+            if kind is float:
+                if _unsafe_float(item):
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                pending.append(item)
+    return False
+
+
+def _orjson_default(obj):
+    # Values converted here (e.g. Decimal -> float) never show up in the rendered data.
+    value = _default(obj)
+    if _has_unsafe_float(value):
+        raise TypeError('%r needs the stock encoder' % obj)
+    return value
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer producing the same bytes with orjson.
+    Indented output (`; indent=4`, the browsable API), non-compact/ASCII settings and data orjson
+    would write differently (non-finite or exponent floats, integers wider than 64 bits) use the stock encoder.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes go through the stock encoder too: it writes UTC as Z, orjson as +00:00.
+            ret = orjson.dumps(data, default=_orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if (b'null' in ret or b'0.0000' in ret or _EXPONENT.search(ret)) and _has_unsafe_float(data):
+            # Raises for NaN under STRICT_JSON like JSONRenderer does.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the output stays a strict JavaScript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        charset = parse_header_parameters(media_type or '')[1].get('charset', 'utf-8').lower()
+        # orjson is always strict (no NaN/Infinity), like STRICT_JSON.
+        if charset not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -0,0 +1,34 @@
+# Keep the cached token authentication and the book change log consistent with the database.
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate
+from .models import Book, BookChange
+
+
+@receiver([post_save, post_delete], sender=Token)
+def token_changed(sender, instance, created=False, **kwargs):
+    # A new key cannot be cached anywhere yet.
+    if not created:
+        invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    # Deactivation (and any other change to the cached user) drops the user's token.
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+    if keys:
+        invalidate(*keys)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    BookChange.objects.create(book_id=instance.pk, action=BookChange.CREATE if created else BookChange.UPDATE)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    # Runs inside the deletion collector's transaction, for queryset deletes too.
+    BookChange.objects.create(book_id=instance.pk, action=BookChange.DELETE)
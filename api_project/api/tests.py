@@ -1,3 +1,370 @@
-from django.test import TestCase
+import datetime
+import decimal
+import io
+import json
+import random
+import unittest
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, override_settings
+from django.db import IntegrityError
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from .authentication import cache_key, get_stats, local_tokens, reset_stats
+from .models import Book, BookChange
+from .renderers import MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer, msgpack, orjson
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """Token lookups are cached in-process and in the Django cache, and invalidated on change"""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        reset_stats()
+        self.user = User.objects.create_user(username='reader', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.url = reverse('book_all-list')
+        Book.objects.create(title='Things Fall Apart', author='Chinua Achebe')
+
+    def get(self, key=None):
+        return self.client.get(self.url, HTTP_AUTHORIZATION='Token %s' % (key or self.token.key))
+
+    def test_repeated_requests_skip_token_query(self):
+        self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        # Only the book query is left once the token is cached.
+        with self.assertNumQueries(1):
+            response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        local_tokens.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        self.assertEqual(get_stats()['miss'], 1)
+        self.assertEqual(get_stats()['local_hit'], 1)
+        self.assertEqual(get_stats()['shared_hit'], 1)
+
+    def test_shared_cache_holds_no_password_hash(self):
+        self.get()
+        cached = cache.get(cache_key(self.token.key))
+        self.assertNotIn(self.user.password, repr(cached))
+
+        local_tokens.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        user = local_tokens.get(self.token.key).user
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'reader', True))
+        # Loaded from the database only when asked for.
+        self.assertTrue(user.check_password('password123'))
+
+    def test_deleted_token_is_rejected(self):
+        self.get()
+        self.token.delete()
+        self.assertEqual(self.get(self.token.key).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_deleted_during_lookup_is_not_cached(self):
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def lookup_then_delete(auth, key):
+            result = lookup(auth, key)
+            Token.objects.filter(key=key).delete()
+            return result
+
+        with patch.object(TokenAuthentication, 'authenticate_credentials', lookup_then_delete):
+            self.get()
+        self.assertEqual(len(local_tokens.entries), 0)
+        self.assertEqual(self.get(self.token.key).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_is_not_cached(self):
+        self.assertEqual(self.get('0' * 40).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(local_tokens.entries), 0)
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.client.get(reverse('auth-cache-stats'), HTTP_AUTHORIZATION='Token %s' % self.token.key).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        admin = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('auth-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'local_hit', 'shared_hit', 'miss', 'hit_rate', 'local_entries'})
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class ORJSONRendererTestCase(APITestCase):
+    """ORJSONRenderer/ORJSONParser are drop-in replacements for the stock JSON classes"""
+
+    data = [{
+        'id': 1, 'title': 'Caf\u00e9 \u2028 \u2029 "quoted" \\ \U0001f4da', 'author': gettext_lazy('Anonymous'),
+        'price': decimal.Decimal('12.50'), 'published': datetime.datetime(2020, 1, 2, 3, 4, 5, 600000, tzinfo=datetime.timezone.utc),
+        'on': datetime.date(2020, 1, 2), 'tags': ('a', 'b'), 'score': 1.5, 'empty': None, 'flag': True,
+    }]
+
+    def assertSameBytes(self, data, fast=True):
+        if fast:
+            with patch.object(JSONRenderer, 'render', side_effect=AssertionError('fell back to the stock encoder')):
+                rendered = ORJSONRenderer().render(data)
+        else:
+            rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertSameBytes(self.data)
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_same_bytes_per_type(self):
+        values = [
+            datetime.datetime(2020, 1, 2, 3, 4, 5, 600000, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            datetime.datetime(2020, 1, 2, 3, 4, 5, 123456), datetime.date(2020, 1, 2), datetime.time(3, 4, 5, 600000),
+            decimal.Decimal('12.50'), gettext_lazy('Anonymous'), 'Caf\u00e9 \u2028 \u2029 "quoted" \\ \U0001f4da',
+            ('a', 'b'), 1.5, 0.1, 1e-4, 1e15, -0.0, 2 ** 63 - 1, None, True,
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertSameBytes({'value': value})
+        # Written differently by orjson, so these take the stock encoder.
+        for value in [1.5e-5, 8.530132475717321e-05, 1.5e-7, 1e16]:
+            with self.subTest(value=value):
+                self.assertSameBytes({'value': value}, fast=False)
+
+    def test_same_bytes_for_random_floats(self):
+        rng = random.Random(0)
+        values = [rng.choice([-1, 1]) * rng.random() * 10 ** rng.randint(-12, 20) for _ in range(2000)]
+        for value in values:
+            self.assertSameBytes({'value': value}, fast=False)
+        self.assertSameBytes([{'value': value} for value in values], fast=False)
+
+    def test_values_orjson_writes_differently_fall_back(self):
+        for value in [2 ** 70, 1e16, 1.5e-7, 1.5e-5, 8.530132475717321e-05, decimal.Decimal('1E+20'), decimal.Decimal('0.000015')]:
+            with self.subTest(value=value):
+                self.assertEqual(ORJSONRenderer().render({'value': value}), JSONRenderer().render({'value': value}))
+        # Not finite: rejected under STRICT_JSON, as by the stock renderer, instead of written as null.
+        for value in [float('nan'), float('inf')]:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                ORJSONRenderer().render({'value': value})
+        renderer = type('LenientRenderer', (ORJSONRenderer,), {'strict': False})()
+        self.assertEqual(renderer.render({'value': float('nan')}), b'{"value":NaN}')
+
+    def test_indent_falls_back(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(ORJSONRenderer().render(self.data, media_type), JSONRenderer().render(self.data, media_type))
+
+    def test_parser_matches_json_parser(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_endpoint_output_unchanged(self):
+        Book.objects.create(title='Half of a Yellow Sun', author='Chimamanda Ngozi Adichie')
+        response = self.client.get(reverse('book-list'))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class MessagePackTestCase(APITestCase):
+    """BookViewSet speaks application/msgpack"""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='writer'))
+        self.book = Book.objects.create(title='Season of Migration to the North', author='Tayeb Salih')
+
+    def test_list_round_trip(self):
+        response = self.client.get(reverse('book_all-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), [{'id': self.book.pk, 'title': self.book.title, 'author': self.book.author}])
+        # Same values as the JSON representation.
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(reverse('book_all-list')).json())
+
+    def test_create_from_msgpack(self):
+        body = msgpack.packb({'title': 'Wizard of the Crow', 'author': 'Ngugi wa Thiongo'})
+        response = self.client.post(reverse('book_all-list'), body, content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(MessagePackParser().parse(io.BytesIO(response.content))['title'], 'Wizard of the Crow')
+
+    def test_invalid_body(self):
+        response = self.client.post(reverse('book_all-list'), b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_renders_same_values_as_json(self):
+        data = ORJSONRendererTestCase.data
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(data)), JSONParser().parse(io.BytesIO(JSONRenderer().render(data))))
+
+
+@override_settings(BOOK_CHANGE_FEED_GRACE=0)
+class BookChangeFeedTestCase(APITestCase):
+    """Book writes are logged in their transaction and served as deltas after a cursor"""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='syncer'))
+        self.url = reverse('book-changes')
+
+    def feed(self, since, **params):
+        return self.client.get(self.url, dict(params, since=since))
+
+    def test_deltas_after_cursor(self):
+        kept = Book.objects.create(title='Arrow of God', author='Chinua Achebe')
+        cursor = self.client.get(self.url).data['next']
+        gone = Book.objects.create(title='Draft', author='Nobody')
+        kept.title = 'Arrow of God (1964)'
+        kept.save()
+        kept.save()
+        gone_pk = gone.pk
+        gone.delete()
+        added = Book.objects.create(title='Anthills of the Savannah', author='Chinua Achebe')
+
+        response = self.feed(cursor)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Repeated writes to one book collapse into its current state.
+        self.assertEqual(
+            [(change['action'], change['id']) for change in response.data['changes']],
+            [('update', kept.pk), ('delete', gone_pk), ('create', added.pk)],
+        )
+        self.assertEqual(response.data['changes'][0]['book']['title'], 'Arrow of God (1964)')
+        self.assertIsNone(response.data['changes'][1]['book'])
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(self.feed(response.data['next']).data['changes'], [])
+
+    def test_paging(self):
+        books = [Book.objects.create(title='Book %d' % i, author='A') for i in range(5)]
+        seen, cursor, has_more = [], 0, True
+        while has_more:
+            with self.assertNumQueries(3):
+                data = self.feed(cursor, limit=2).data
+            seen += [change['id'] for change in data['changes']]
+            cursor, has_more = data['next'], data['has_more']
+        self.assertEqual(seen, [book.pk for book in books])
+
+    @override_settings(BOOK_CHANGE_FEED_GRACE=60)
+    def test_recent_entries_are_held_back(self):
+        old = Book.objects.create(title='Nervous Conditions', author='Tsitsi Dangarembga')
+        BookChange.objects.update(changed_at=timezone.now() - datetime.timedelta(minutes=5))
+        Book.objects.create(title='This Mournable Body', author='Tsitsi Dangarembga')
+        old_entry = BookChange.objects.get(book_id=old.pk).pk
+        self.assertEqual(self.client.get(self.url).data['next'], old_entry)
+
+        # A lower id may still be uncommitted while the newest one is visible, so the cursor stops before it.
+        data = self.feed(0).data
+        self.assertEqual([change['id'] for change in data['changes']], [old.pk])
+        self.assertEqual((data['next'], data['has_more']), (old_entry, False))
+        self.assertEqual(self.feed(data['next']).data, {'changes': [], 'next': old_entry, 'has_more': False})
+
+        BookChange.objects.update(changed_at=timezone.now() - datetime.timedelta(minutes=5))
+        self.assertEqual(len(self.feed(data['next']).data['changes']), 1)
+
+    def test_log_rolls_back_with_the_write(self):
+        with patch.object(BookChange.objects, 'create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                Book.objects.create(title='Never written', author='A')
+        self.assertFalse(Book.objects.exists())
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.feed('abc').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.feed(-1).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compaction(self):
+        book = Book.objects.create(title='Petals of Blood', author='Ngugi wa Thiongo')
+        book.save()
+        gone = Book.objects.create(title='Draft', author='Nobody')
+        gone_pk = gone.pk
+        gone.delete()
+        call_command('compact_book_changes', days=0, stdout=io.StringIO())
+        # Superseded entries are gone; the latest state of every book is still in the feed.
+        self.assertEqual(list(BookChange.objects.values_list('book_id', 'action')), [(book.pk, 'update'), (gone_pk, 'delete')])
+        self.assertEqual(len(self.feed(0).data['changes']), 2)
+
+        call_command('compact_book_changes', days=0, drop_deletes=True, stdout=io.StringIO())
+        self.assertEqual(list(BookChange.objects.values_list('book_id', 'action')), [(book.pk, 'update')])
+        self.assertEqual(self.feed(0).status_code, status.HTTP_410_GONE)
+        self.assertEqual(self.feed(self.client.get(self.url).data['next']).status_code, status.HTTP_200_OK)
+
+        call_command('compact_book_changes', days=30, drop_deletes=True, stdout=io.StringIO())
+        self.assertEqual(BookChange.objects.count(), 1)
+
+
+class BookMultiGetTestCase(APITestCase):
+    """BookViewSet.multi resolves a list of ids with one query"""
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='reader'))
+        self.books = [Book.objects.create(title='Book %d' % i, author='Author %d' % i) for i in range(5)]
+        self.url = reverse('book_all-multi')
+
+    def test_requested_order_and_missing(self):
+        ids = [self.books[3].pk, 999, self.books[0].pk, self.books[3].pk, self.books[1].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book['id'] for book in response.data['results']], [self.books[3].pk, self.books[0].pk, self.books[1].pk])
+        self.assertEqual(response.data['results'][0], {'id': self.books[3].pk, 'title': 'Book 3', 'author': 'Author 3'})
+        self.assertEqual(response.data['missing'], [999])
+
+    def test_invalid_ids(self):
+        for ids in ['', '1,x', ',']:
+            self.assertEqual(self.client.get(self.url, {'ids': ids}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BOOK_MULTI_GET_MAX_IDS=3)
+    def test_max_ids(self):
+        self.assertEqual(self.client.get(self.url, {'ids': '1,2,3,4'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'ids': '1,2,3,3,2'}).status_code, status.HTTP_200_OK)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url, {'ids': '1'}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    """The loadtest command against a live server"""
+
+    def test_report(self):
+        Book.objects.create(title='Nervous Conditions', author='Tsitsi Dangarembga')
+        out = io.StringIO()
+        call_command(
+            'loadtest', url=self.live_server_url, username='loadtester', password='secret-pass-1', create_user=True,
+            concurrency=2, duration=1, write_ratio=0.5, stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['requests'], 0)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(set(report['latency_ms']), {'p50', 'p95', 'p99'})
+        self.assertIn('list books_all/', report['operations'])
+        # Books created by the writers are deleted again.
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_bad_credentials(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', url=self.live_server_url, username='nobody', password='wrong', duration=1, stdout=io.StringIO())
+
+
+class ProfilingMiddlewareTestCase(APITestCase):
+    """The shared observability.profiling middleware is installed"""
+
+    def test_server_timing_header(self):
+        Book.objects.create(title='Purple Hibiscus', author='Chimamanda Ngozi Adichie')
+        response = self.client.get(reverse('book-list'))
+        self.assertRegex(response['Server-Timing'], r'^view;dur=[0-9.]+, sql;dur=[0-9.]+;desc="1 queries"')
+
+
+class MetricsTestCase(APITestCase):
+    """The shared observability.metrics middleware counts requests per URL name"""
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('book-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertRegex(response.content.decode(), r'django_http_requests_total\{route="book-list",method="GET",status="200"\} [1-9]')
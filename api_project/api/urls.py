@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import BookList, BookViewSet
+from .views import AuthCacheStatsView, BookChangesView, BookList, BookViewSet
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 
@@ -8,6 +8,8 @@ router.register(r'books_all', BookViewSet, basename='book_all')
 
 urlpatterns = [
     path('books/', BookList.as_view(), name='book-list'),
+    path('books/changes/', BookChangesView.as_view(), name='book-changes'),
     path('', include(router.urls)),
     path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
+    path('auth-cache/stats/', AuthCacheStatsView.as_view(), name='auth-cache-stats'),
 ]
@@ -1,17 +1,84 @@
-from rest_framework import viewsets, permissions
- from rest_framework import generics,viewsets, permissions
- from .models import Book
- from .serializers import BookSerializer
- from rest_framework.permissions import IsAuthenticated, AllowAny
- 
- # Create your views here.
- 
- class BookList(generics.ListAPIView):
-     queryset = Book.objects.all()
-     serializer_class = BookSerializer
-     permission_classes = [AllowAny]  #Allow any user to access
- 
- class BookViewSet(viewsets.ModelViewSet):
-     queryset = Book.objects.all()
-     serializer_class = BookSerializer
-     permission_classes = [permissions.IsAuthenticated]  # Restrict access to authenticated users
+from django.conf import settings
+from rest_framework import generics, viewsets, permissions, status
+from rest_framework.decorators import action
+from .models import Book
+from .serializers import BookSerializer
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .authentication import get_stats
+from .changes import changes_since, horizon, latest_cursor
+
+# Create your views here.
+
+class BookList(generics.ListAPIView):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [AllowAny]  #Allow any user to access
+
+class BookViewSet(viewsets.ModelViewSet):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.IsAuthenticated]  # Restrict access to authenticated users
+
+    @action(detail=False, methods=['get'])
+    def multi(self, request):
+        """
+        GET /books_all/multi/?ids=3,1,2: the books in the requested order with one in_bulk query,
+        plus the ids that do not exist. At most BOOK_MULTI_GET_MAX_IDS distinct ids per call.
+        """
+        max_ids = getattr(settings, 'BOOK_MULTI_GET_MAX_IDS', 200)
+        try:
+            # Duplicates are dropped, keeping the first occurrence.
+            ids = list(dict.fromkeys(int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()))
+        except ValueError:
+            return Response({"error": "ids must be a comma-separated list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > max_ids:
+            return Response({"error": "at most %d ids per request" % max_ids}, status=status.HTTP_400_BAD_REQUEST)
+
+        books = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        return Response({
+            'results': self.get_serializer([books[pk] for pk in ids if pk in books], many=True).data,
+            'missing': [pk for pk in ids if pk not in books],
+        })
+
+class AuthCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]  # Hit rates of this process's token cache, for admins only
+
+    def get(self, request):
+        return Response(get_stats())
+
+class BookChangesView(APIView):
+    """
+    Book changes after ?since=<cursor>, oldest first, with the cursor to send next.
+    Without `since` only the current cursor is returned: read it, then download /books_all/.
+    Changes show up once they are BOOK_CHANGE_FEED_GRACE seconds old.
+    """
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        if 'since' not in request.query_params:
+            return Response({'changes': [], 'next': latest_cursor(), 'has_more': False})
+        try:
+            since = int(request.query_params['since'])
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            return Response({"error": "since and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"error": "since must be >= 0 and limit >= 1"}, status=status.HTTP_400_BAD_REQUEST)
+        if since < horizon():
+            # Compaction dropped deletes this client has not seen.
+            return Response({"error": "cursor is too old, download /books_all/ again"}, status=status.HTTP_410_GONE)
+
+        changes, cursor, has_more = changes_since(since, limit)
+        return Response({
+            'changes': [
+                {'action': action, 'id': book_id, 'book': BookSerializer(book).data if book is not None else None}
+                for action, book_id, book in changes
+            ],
+            'next': cursor,
+            'has_more': has_more,
+        })
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,14 +47,51 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 } 
 
+# orjson replaces the stock JSON renderer/parser and MessagePack (Accept/Content-Type: application/msgpack,
+# or ?format=msgpack) is offered when the libraries are installed: pip install orjson msgpack
+if find_spec('orjson'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'][0] = 'api.renderers.ORJSONRenderer'
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'][0] = 'api.renderers.ORJSONParser'
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'api.renderers.MessagePackParser')
+
+# Cached token lookups: TIMEOUT in the shared Django cache, LOCAL_TIMEOUT in each process's LRU.
+# A deleted token or deactivated user may still be accepted by other processes for LOCAL_TIMEOUT seconds
+# (with a per-process cache such as LocMemCache, for TIMEOUT seconds). INVALIDATION_TIMEOUT is how long
+# an invalidated token stays out of the shared cache, so a lookup racing the change cannot re-cache it.
+TOKEN_AUTH_CACHE = {
+    'TIMEOUT': 60,
+    'LOCAL_TIMEOUT': 5,
+    'INVALIDATION_TIMEOUT': 5,
+    'MAX_ENTRIES': 1024,
+}
+
+# Largest ?ids= list accepted by /api/books_all/multi/.
+BOOK_MULTI_GET_MAX_IDS = 200
+
+# /api/books/changes/ only serves log entries older than this many seconds, so a write committed
+# out of id order is not skipped. Every transaction that writes books must commit within it.
+BOOK_CHANGE_FEED_GRACE = 5
+
 MIDDLEWARE = [
+    'observability.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,8 +99,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'observability.profiling.ProfilingMiddleware',
 ]
 
+# ProfilingMiddleware: Server-Timing header on every response, and a JSON log line
+# ("observability.profiling" logger) for a sample of the requests to these URL names.
+PROFILING_SERVER_TIMING = True
+PROFILING_LOG_ROUTES = {
+    # '*': 0.01,
+}
+
+# MetricsMiddleware / GET /metrics. Under gunicorn, point METRICS_DIR at a directory shared by
+# the workers (emptied on deploy); each worker writes its totals there every METRICS_FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+
 ROOT_URLCONF = 'api_project.urls'
 
 TEMPLATES = [
@@ -93,6 +146,27 @@ DATABASES = {
 }
 
 
+# Cache
+# Cached tokens and their invalidations must be seen by every worker process, so the cache is
+# shared: Redis when REDIS_URL is set, otherwise files in a directory all workers on the host can
+# reach. The test runner gets its own directory.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / '.cache' / ('test' if sys.argv[1:2] == ['test'] else 'default')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -17,9 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from observability.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('relationship_app.urls')),
     path('accounts/', include('django.contrib.auth.urls')), 
     path('dashboard/', include('relationship_app.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus text exposition
 ]
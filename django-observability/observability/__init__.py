@@ -0,0 +1,2 @@
+# Request profiling and metrics middleware shared by the projects in this repository. Installed into
+# each project's environment with `pip install -e django-observability` (see its README).
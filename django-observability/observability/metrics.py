@@ -0,0 +1,240 @@
+# Prometheus text-format metrics without a client library: counters and fixed-bucket histograms
+# labeled by URL name, method and status. With METRICS_DIR set, every process periodically writes
+# its totals to its own file there and /metrics sums all the files, so gunicorn workers add up.
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class Registry:
+    """
+    Metric values of this process: counters[name][labels] = value and
+    histograms[name][labels] = [per-bucket counts, sum].
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+        # pid + start time: a recycled pid must not overwrite a dead worker's totals.
+        self.filename = 'metrics-%d-%d.json' % (self.pid, time.time_ns())
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _check_fork(self):
+        # Values inherited from a pre-forking parent (gunicorn --preload) belong to the parent.
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, amount):
+        with self.lock:
+            self._check_fork()
+            values = self.counters.setdefault(name, {})
+            values[labels] = values.get(labels, 0) + amount
+        self.maybe_flush()
+
+    def observe(self, name, labels, buckets, value):
+        with self.lock:
+            self._check_fork()
+            values = self.histograms.setdefault(name, {})
+            counts, total = values.get(labels) or ([0] * len(buckets), 0.0)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            values[labels] = (counts, total + value)
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                'counters': {name: [[list(labels), value] for labels, value in values.items()]
+                             for name, values in self.counters.items()},
+                'histograms': {name: [[list(labels), list(counts), total] for labels, (counts, total) in values.items()]
+                               for name, values in self.histograms.items()},
+            }
+
+    def maybe_flush(self):
+        if metrics_dir() and time.monotonic() - self.last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            self.flush()
+
+    def flush(self):
+        directory = metrics_dir()
+        if not directory:
+            return
+        self.last_flush = time.monotonic()
+        data = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        # Written to a temporary file and renamed, so readers never see half a file.
+        fd, path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(path, os.path.join(directory, self.filename))
+
+    def collect(self):
+        """
+        Sum the values of every process (or only this one without METRICS_DIR).
+        """
+        directory = metrics_dir()
+        if not directory:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for name in os.listdir(directory):
+                if name.startswith('metrics-') and name.endswith('.json'):
+                    try:
+                        with open(os.path.join(directory, name)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, rows in snapshot['counters'].items():
+                values = counters.setdefault(name, {})
+                for labels, value in rows:
+                    values[tuple(labels)] = values.get(tuple(labels), 0) + value
+            for name, rows in snapshot['histograms'].items():
+                values = histograms.setdefault(name, {})
+                for labels, counts, total in rows:
+                    merged, merged_total = values.get(tuple(labels)) or ([0] * len(counts), 0.0)
+                    values[tuple(labels)] = ([a + b for a, b in zip(merged, counts)], merged_total + total)
+        return counters, histograms
+
+    def exposition(self):
+        counters, histograms = self.collect()
+        lines = []
+        for metric in sorted(self.metrics.values(), key=lambda metric: metric.name):
+            lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+            lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+            if metric.kind == 'counter':
+                for labels, value in sorted(counters.get(metric.name, {}).items()):
+                    lines.append('%s%s %s' % (metric.name, format_labels(metric.labelnames, labels), format_value(value)))
+                continue
+            for labels, (counts, total) in sorted(histograms.get(metric.name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(metric.buckets, counts):
+                    cumulative += count
+                    le = format_labels(metric.labelnames + ('le',), labels + (format_value(bound),))
+                    lines.append('%s_bucket%s %d' % (metric.name, le, cumulative))
+                lines.append('%s_sum%s %s' % (metric.name, format_labels(metric.labelnames, labels), format_value(total)))
+                lines.append('%s_count%s %d' % (metric.name, format_labels(metric.labelnames, labels), cumulative))
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for value in values)
+    return '{%s}' % ','.join('%s="%s"' % (name, value) for name, value in zip(names, escaped))
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def inc(self, *labels, amount=1):
+        registry.inc(self.name, tuple(str(label) for label in labels), amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+        registry.register(self)
+
+    def observe(self, value, *labels):
+        registry.observe(self.name, tuple(str(label) for label in labels), self.buckets, value)
+
+
+requests_total = Counter(
+    'django_http_requests_total', 'Requests by URL name, method and status.', ('route', 'method', 'status'),
+)
+request_duration = Histogram(
+    'django_http_request_duration_seconds', 'Request latency by URL name, method and status.', ('route', 'method', 'status'),
+)
+
+
+class MetricsMiddleware:
+    """
+    Put it first in MIDDLEWARE so the latency covers the whole middleware stack.
+    Routes are labeled by URL name, never by path, to keep the number of series bounded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        route = (match.view_name or '<unnamed>') if match is not None else '<unresolved>'
+        method = request.method if request.method in METHODS else 'other'
+        labels = (route, method, response.status_code)
+        requests_total.inc(*labels)
+        request_duration.observe(duration, *labels)
+
+
+def metrics_view(request):
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
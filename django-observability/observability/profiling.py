@@ -0,0 +1,194 @@
+# Per-request profiling: SQL, view, render and serializer time as a Server-Timing header, plus a
+# sampled JSON log line per route. Only depends on Django (DRF serializers are timed when installed),
+# so every project lists it in its MIDDLEWARE.
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.utils import CursorWrapper
+from django.template.base import Template
+
+logger = logging.getLogger('observability.profiling')
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """
+    Timings collected for one request, in seconds.
+    """
+    def __init__(self):
+        self.timings = {'sql': 0.0, 'view': 0.0, 'render': 0.0, 'serializer': 0.0}
+        self.queries = 0
+        self.depth = {}
+
+    @contextmanager
+    def query(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings['sql'] += time.perf_counter() - start
+            self.queries += 1
+
+    @contextmanager
+    def timed(self, name):
+        # Nested sections of the same kind (an {% include %}, a nested serializer) count once.
+        self.depth[name] = self.depth.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth[name] -= 1
+            if not self.depth[name]:
+                self.timings[name] += time.perf_counter() - start
+
+    def server_timing(self):
+        metrics = [
+            'view;dur=%.1f' % (self.timings['view'] * 1000),
+            'sql;dur=%.1f;desc="%d queries"' % (self.timings['sql'] * 1000, self.queries),
+        ]
+        metrics += ['%s;dur=%.1f' % (name, self.timings[name] * 1000) for name in ('serializer', 'render') if self.timings[name]]
+        return ', '.join(metrics)
+
+
+def timed(name):
+    """
+    Decorator timing `func` into the current request's profile under `name` (a no-op outside one).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with profile.timed(name):
+                return func(*args, **kwargs)
+        wrapper._profiled = True
+        return wrapper
+    return decorator
+
+
+def timed_query(func):
+    """
+    Decorator timing a cursor method into the current request's profile. Cursors are wrapped
+    rather than connections: async views run the ORM in sync_to_async's thread, on connections
+    of their own, and the context (with the profile) is carried over to it.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.query():
+            return func(*args, **kwargs)
+    wrapper._profiled = True
+    return wrapper
+
+
+def _instrument():
+    # SQL (every ORM query goes through CursorWrapper), template rendering (render() shortcut,
+    # TemplateResponse, the browsable API) and DRF serializer output.
+    for name in ('execute', 'executemany'):
+        if not getattr(getattr(CursorWrapper, name), '_profiled', False):
+            setattr(CursorWrapper, name, timed_query(getattr(CursorWrapper, name)))
+    if not getattr(Template.render, '_profiled', False):
+        Template.render = timed('render')(Template.render)
+    try:
+        from rest_framework import serializers
+    except ImportError:
+        return
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, '_profiled', False):
+            cls.data = property(timed('serializer')(cls.data.fget))
+
+
+def _sample_rate(request):
+    """
+    PROFILING_LOG_ROUTES maps URL names ('book-list', 'admin:index') or '*' to a sample rate.
+    """
+    routes = getattr(settings, 'PROFILING_LOG_ROUTES', {})
+    match = request.resolver_match
+    if match is not None and match.view_name in routes:
+        return routes[match.view_name]
+    return routes.get('*', 0)
+
+
+class ProfilingMiddleware:
+    """
+    Put it last in MIDDLEWARE so that "view" covers URL resolution, the view and response
+    rendering rather than other middleware. SQL and serializer time are part of the view time.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrument()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token = self.start()
+        try:
+            view_start = time.perf_counter()
+            response = self.get_response(request)
+            profile.timings['view'] = time.perf_counter() - view_start
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile, token = self.start()
+        try:
+            view_start = time.perf_counter()
+            response = await self.get_response(request)
+            profile.timings['view'] = time.perf_counter() - view_start
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def start(self):
+        profile = RequestProfile()
+        return profile, _current.set(profile)
+
+    def process_template_response(self, request, response):
+        # Django renders TemplateResponses (and DRF Responses) after the view returns; time that too.
+        render = response.render
+
+        def timed_render():
+            profile = _current.get()
+            if profile is None:
+                return render()
+            with profile.timed('render'):
+                return render()
+
+        response.render = timed_render
+        return response
+
+    def finish(self, request, response, profile):
+        if getattr(settings, 'PROFILING_SERVER_TIMING', True):
+            response['Server-Timing'] = profile.server_timing()
+        rate = _sample_rate(request)
+        if rate and random.random() < rate:
+            match = request.resolver_match
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': match.view_name if match is not None else None,
+                'status': response.status_code,
+                'view_ms': round(profile.timings['view'] * 1000, 2),
+                'sql_ms': round(profile.timings['sql'] * 1000, 2),
+                'sql_queries': profile.queries,
+                'render_ms': round(profile.timings['render'] * 1000, 2),
+                'serializer_ms': round(profile.timings['serializer'] * 1000, 2),
+            }, sort_keys=True))
+        return response